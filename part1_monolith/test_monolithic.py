@@ -1,5 +1,19 @@
 # test_monolithic.py
+import contextlib
+import csv
+import io
+import json
+import os
+
+import pytest
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
 from monolithic_app import create_tables, SessionLocal, create_product, get_all_products
+from monolithic_app import Base, import_products, export_products
+import monolithic_app
 
 def test_system():
     try:
@@ -29,5 +43,171 @@ def test_system():
     except Exception as e:
         print(f"✗ Error: {e}")
 
+
+def test_csv_import_and_export(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'inventory.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+
+    source = io.StringIO()
+    writer = csv.writer(source)
+    writer.writerow(["name", "quantity", "price"])
+    writer.writerows([f"Product {i}", i, 1.5] for i in range(2500))
+    writer.writerow(["Broken", -1, 1.5])
+    writer.writerow(["Typo", "many", 1.5])
+    writer.writerow(["x" * 101, 1, 1.5])
+    writer.writerow(["  ", 1, 1.5])
+    source.seek(0)
+
+    commits = []
+    imported, rejected, _ = import_products(session, source, batch_size=100, commit_every=1000,
+                                            report=lambda rows, seconds: commits.append(rows))
+    assert imported == 2500
+    assert rejected == [
+        (2502, "Quantity cannot be negative"),
+        (2503, "Quantity and price must be numbers"),
+        (2504, "Name cannot be longer than 100 characters"),
+        (2505, "Name cannot be empty"),
+    ]
+    assert commits == [1000, 2000]
+
+    exported = io.StringIO()
+    assert export_products(session, exported, batch_size=300)[0] == 2500
+    rows = list(csv.DictReader(io.StringIO(exported.getvalue())))
+    assert rows[0] == {"id": "1", "name": "Product 0", "quantity": "0", "price": "1.5"}
+    assert [int(row["id"]) for row in rows] == list(range(1, 2501))
+    session.close()
+
+
+def test_menu_survives_unreadable_csv(tmp_path, monkeypatch, capsys):
+    engine = create_engine(f"sqlite:///{tmp_path / 'inventory.db'}")
+    Base.metadata.create_all(bind=engine)
+    latin1 = tmp_path / "latin1.csv"
+    latin1.write_bytes("name,quantity,price\nCaf\xe9,1,2.5\n".encode("latin-1"))
+    answers = iter(["7", str(latin1), "8", str(tmp_path / "missing" / "out.csv"), "6"])
+    monkeypatch.setattr("builtins.input", lambda prompt: next(answers))
+
+    monolithic_app.menu(sessionmaker(bind=engine))
+    output = capsys.readouterr().out
+    assert "Error: 'utf-8' codec can't decode" in output
+    assert "Error: [Errno 2]" in output
+    assert output.rstrip().endswith("Goodbye!")
+
+
+def test_scripted_commands(tmp_path, monkeypatch, capsys):
+    engine = create_engine(f"sqlite:///{tmp_path / 'inventory.db'}")
+    monkeypatch.setattr(monolithic_app, "engine", engine)
+    monkeypatch.setattr(monolithic_app, "SessionLocal", sessionmaker(bind=engine))
+
+    def run(*argv, stdin=""):
+        monkeypatch.setattr("sys.stdin", io.StringIO(stdin))
+        status = monolithic_app.main(list(argv))
+        return status, [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    adds = "\n".join([
+        json.dumps({"name": "Laptop", "quantity": 5, "price": 999.99}),
+        json.dumps({"name": "Mouse", "quantity": -1, "price": 29.99}),
+        "not json",
+        "",
+        json.dumps({"name": "Mouse", "quantity": "20", "price": 29.99}),
+        json.dumps({"name": "Keyboard", "quantity": 15, "price": 79.99}),
+        json.dumps({"name": "Half", "quantity": 1.7, "price": 1.0}),
+        json.dumps({"name": "Flag", "quantity": True, "price": 1.0}),
+    ])
+    status, results = run("add", "--commit-every", "2", stdin=adds)
+    assert status == 1
+    assert results == [
+        {"ok": True, "id": 1, "line": 1},
+        {"ok": False, "error": "Quantity cannot be negative", "line": 2},
+        {"ok": False, "error": "Invalid JSON", "line": 3},
+        {"ok": True, "id": 2, "line": 5},
+        {"ok": True, "id": 3, "line": 6},
+        {"ok": False, "error": "Quantity and price must be numbers", "line": 7},
+        {"ok": False, "error": "Quantity and price must be numbers", "line": 8},
+    ]
+
+    assert run("adjust", "1", "-2") == (0, [{"ok": True, "id": 1, "message": "Quantity is now 3"}])
+    assert run("adjust", "1", "-4")[1] == [{"ok": False, "id": 1, "error": "Only 3 in stock"}]
+    # A rejected update leaves every field alone
+    assert run("update", "2", "--name", "Trackball", "--price", "-1")[0] == 1
+    assert run("get", "2")[1][0]["product"]["name"] == "Mouse"
+    status, results = run("update", stdin=json.dumps({"id": 2, "name": "Trackball"}) + "\n")
+    assert results == [{"ok": True, "id": 2, "message": "Product updated", "line": 1}]
+    assert run("delete", stdin="3\n99\n")[1] == [
+        {"ok": True, "id": 3, "message": "Product deleted", "line": 1},
+        {"ok": False, "id": 99, "error": "Product not found", "line": 2},
+    ]
+
+    assert run("get", "2")[1] == [{"ok": True, "product": {"id": 2, "name": "Trackball", "quantity": 20, "price": 29.99}}]
+    assert run("list", "--batch-size", "1") == (0, [
+        {"id": 1, "name": "Laptop", "quantity": 3, "price": 999.99},
+        {"id": 2, "name": "Trackball", "quantity": 20, "price": 29.99},
+    ])
+
+
+def test_failed_commit_reports_the_rolled_back_operations(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'inventory.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    commit = session.commit
+    commits = []
+
+    def failing_commit():
+        commits.append(1)
+        if len(commits) == 2:
+            raise OperationalError("COMMIT", {}, Exception("database is locked"))
+        commit()
+
+    session.commit = failing_commit
+    records = [(i, {"name": f"Product {i}", "quantity": i, "price": 1.5}) for i in range(1, 6)]
+    out = io.StringIO()
+    assert monolithic_app.run_operations(session, monolithic_app.op_add, records, commit_every=2, out=out) is False
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [
+        {"ok": True, "id": 1, "line": 1},
+        {"ok": True, "id": 2, "line": 2},
+        {"ok": False, "id": 3, "error": "Rolled back: database is locked", "line": 3},
+        {"ok": False, "id": 4, "error": "Rolled back: database is locked", "line": 4},
+    ]
+    assert [p.name for p in get_all_products(session)] == ["Product 1", "Product 2"]
+    session.close()
+
+
+def resident_bytes():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+# Four listings of 500k rows take ~20 s, so this one is opt-in
+@pytest.mark.skipif(not os.getenv("RUN_SLOW_TESTS"), reason="slow: set RUN_SLOW_TESTS=1 to run")
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="reads RSS from /proc")
+def test_menu_listings_run_in_flat_memory(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'inventory.db'}")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        for start in range(0, 500_000, 10_000):
+            monolithic_app.insert_batch(session, [
+                {"name": f"Product {i}", "quantity": i % 100, "price": 1.5} for i in range(start, start + 10_000)
+            ])
+        session.commit()
+
+    listings = 4
+    rss = []
+    answers = iter(["1"] * listings + ["6"])
+
+    def answer(prompt):
+        if prompt.startswith("Choose"):
+            rss.append(resident_bytes())
+        return next(answers)
+
+    monkeypatch.setattr("builtins.input", answer)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        monolithic_app.menu(sessionmaker(bind=engine))
+
+    # rss[0] is before any listing. Streaming adds about a batch of rows;
+    # loading them all as Product objects left 29 MiB more after the first
+    assert len(rss) == listings + 1
+    assert max(rss[1:]) - rss[0] < 8 * 1024 * 1024, [r // 1024 for r in rss]
+
+
 if __name__ == "__main__":
-    test_system()
\ No newline at end of file
+    test_system()
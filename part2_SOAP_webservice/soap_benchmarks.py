@@ -0,0 +1,533 @@
+# soap_benchmarks.py
+"""Micro-benchmarks for the SOAP service, run in-process against SQLite
+
+    python soap_benchmarks.py typed --products 10000
+    python soap_benchmarks.py batch --products 1000
+    python soap_benchmarks.py by-ids --ids 500
+    python soap_benchmarks.py server --workers 1 4 16
+    python soap_benchmarks.py validation --items 1 10 100 1000 10000
+    python soap_benchmarks.py cache --products 10000
+    python soap_benchmarks.py protocols --products 10000
+    python soap_benchmarks.py compression --products 20000
+    python soap_benchmarks.py client --calls 500
+"""
+import argparse
+import gzip
+import http.client
+import io
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+import requests
+from lxml import etree
+from sqlalchemy import create_engine, insert
+from spyne import MethodContext
+from spyne.server import ServerBase
+from zeep import Client
+from zeep.cache import SqliteCache
+from zeep.transports import Transport
+
+import soap_service
+from soap_client import CompressingTransport, make_client
+from soap_service import Base, Product, SessionLocal
+
+def seed_database(directory, products):
+    engine = create_engine(f"sqlite:///{directory}/bench.db")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Product), [
+            {"name": f"Product {i}", "quantity": i % 500, "price": round(i * 0.37, 2)}
+            for i in range(products)
+        ])
+    SessionLocal.configure(bind=engine)
+    return engine
+
+class WsgiTransport(Transport):
+    """zeep transport that calls a WSGI app in-process, timing the server side"""
+
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+        self.server_cpu = 0.0
+
+    def _call(self, method, url, body=b"", headers=None):
+        path, _, query = url.partition("://")[2].partition("/")[2].partition("?")
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": "/" + path,
+            "QUERY_STRING": query,
+            "CONTENT_LENGTH": str(len(body)),
+            "CONTENT_TYPE": (headers or {}).get("Content-Type", "text/xml; charset=utf-8"),
+            "wsgi.input": io.BytesIO(body),
+        }
+        environ.update({
+            f"HTTP_{name.upper().replace('-', '_')}": value
+            for name, value in (headers or {}).items()
+            if name.lower() != "content-type"
+        })
+        setup_testing_defaults(environ)
+        response = requests.Response()
+
+        def start_response(status, response_headers, exc_info=None):
+            response.status_code = int(status.split()[0])
+            response.headers.update(response_headers)
+
+        start = time.process_time()
+        response._content = b"".join(self.app(environ, start_response))
+        self.server_cpu += time.process_time() - start
+        response.url = url
+        return response
+
+    def load(self, url):
+        return self._call("GET", url).content
+
+    def post(self, address, message, headers):
+        return self._call("POST", address, message, headers)
+
+def wsgi_client(app=None):
+    transport = WsgiTransport(app or soap_service.wsgi_application)
+    return Client("http://localhost:8000/?wsdl", transport=transport), transport
+
+LEGACY_PRODUCT = re.compile(r"ID: (\d+), Name: (.*), Quantity: (\d+), Price: \$([\d.]+)")
+
+def parse_legacy(result):
+    """What every client of the string operations has to do"""
+    products = []
+    for line in result:
+        product_id, name, quantity, price = LEGACY_PRODUCT.fullmatch(line).groups()
+        products.append({"id": int(product_id), "name": name, "quantity": int(quantity), "price": float(price)})
+    return products
+
+def parse_typed(result):
+    return [{"id": p.id, "name": p.name, "quantity": p.quantity, "price": p.price} for p in result]
+
+def bench_typed(args):
+    with tempfile.TemporaryDirectory() as directory:
+        seed_database(directory, args.products)
+        client, transport = wsgi_client()
+        operations = {
+            "GetAllProducts (strings)": (client.service.GetAllProducts, parse_legacy),
+            "GetAllProductsTyped": (client.service.GetAllProductsTyped, parse_typed),
+        }
+        print(f"{args.products} products, mean of {args.repeat} calls, CPU per call")
+        print(f"{'operation':<26} {'server':>10} {'client':>10}")
+        for label, (operation, parse) in operations.items():
+            server = total = 0.0
+            for _ in range(args.repeat):
+                transport.server_cpu = 0.0
+                start = time.process_time()
+                products = parse(operation())
+                total += time.process_time() - start
+                server += transport.server_cpu
+            assert len(products) == args.products
+            print(f"{label:<26} {server / args.repeat * 1000:>7.1f} ms {(total - server) / args.repeat * 1000:>7.1f} ms")
+
+def bench_batch(args):
+    with tempfile.TemporaryDirectory() as directory:
+        seed_database(directory, 1)
+        client, _ = wsgi_client()
+        items = [{"name": f"Item {i}", "quantity": i, "price": 1.25} for i in range(args.products)]
+
+        start = time.perf_counter()
+        for item in items:
+            client.service.CreateProduct(**item)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        statuses = client.service.CreateProducts({"ProductIn": items})
+        batch = time.perf_counter() - start
+        assert all(status.success for status in statuses)
+
+        print(f"creating {args.products} products")
+        print(f"{'CreateProduct x N':<22} {single * 1000:>9.1f} ms")
+        print(f"{'CreateProducts':<22} {batch * 1000:>9.1f} ms  ({single / batch:.0f}x faster)")
+
+def bench_by_ids(args):
+    with tempfile.TemporaryDirectory() as directory:
+        seed_database(directory, args.ids * 2)
+        client, _ = wsgi_client()
+        product_ids = list(range(1, args.ids * 2 + 1, 2))
+
+        start = time.perf_counter()
+        for product_id in product_ids:
+            client.service.GetProduct(product_id)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lookups = client.service.GetProductsByIds({"integer": product_ids})
+        batch = time.perf_counter() - start
+        assert [lookup.id for lookup in lookups if lookup.found] == product_ids
+
+        print(f"looking up {args.ids} products")
+        print(f"{'GetProduct x N':<22} {single * 1000:>9.1f} ms")
+        print(f"{'GetProductsByIds':<22} {batch * 1000:>9.1f} ms  ({single / batch:.0f}x faster)")
+
+def soap_envelope(operation, body=""):
+    return (
+        '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+        f'xmlns:tns="inventory.soap"><soapenv:Body><tns:{operation}>{body}</tns:{operation}>'
+        "</soapenv:Body></soapenv:Envelope>"
+    ).encode()
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("localhost", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+def load_client(port, duration, products, listing_every):
+    """Send requests for duration seconds; every listing_every-th one is GetAllProductsTyped"""
+    fast = [soap_envelope("GetProductTyped", f"<tns:product_id>{i % products + 1}</tns:product_id>") for i in range(100)]
+    listing = soap_envelope("GetAllProductsTyped")
+    latencies, listings = [], 0
+    deadline = time.monotonic() + duration
+    sent = 0
+    while time.monotonic() < deadline:
+        is_listing = listing_every and sent % listing_every == listing_every - 1
+        body = listing if is_listing else fast[sent % len(fast)]
+        start = time.perf_counter()
+        conn = http.client.HTTPConnection("localhost", port, timeout=60)
+        conn.request("POST", "/", body, {"Content-Type": "text/xml; charset=utf-8"})
+        response = conn.getresponse()
+        response.read()
+        conn.close()
+        assert response.status == 200, response.status
+        if is_listing:
+            listings += 1
+        else:
+            latencies.append(time.perf_counter() - start)
+        sent += 1
+    return latencies, listings
+
+def start_server(database_url, workers=1, threads=4, env=None):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "soap_server.py", "--port", str(port), "--workers", str(workers),
+         "--threads", str(threads), "--database-url", database_url],
+        cwd=os.path.dirname(os.path.abspath(__file__)), stdout=subprocess.DEVNULL,
+        env={**os.environ, **(env or {})},
+    )
+    wait_for_server(port)
+    return server, port
+
+def bench_server(args):
+    with tempfile.TemporaryDirectory() as directory:
+        seed_database(directory, args.products)
+        database_url = f"sqlite:///{directory}/bench.db"
+        print(f"{args.clients} client processes for {args.duration}s, {args.products} products, "
+              f"1 in {args.listing_every} calls is GetAllProductsTyped, {os.cpu_count()} CPU(s)")
+        print(f"{'workers x threads':<18} {'requests/s':>11} {'GetProductTyped p50':>20} {'p95':>9}")
+        for workers in args.workers:
+            server, port = start_server(database_url, workers, args.threads)
+            try:
+                with ProcessPoolExecutor(args.clients) as pool:
+                    results = list(pool.map(
+                        load_client, [port] * args.clients, [args.duration] * args.clients,
+                        [args.products] * args.clients, [args.listing_every] * args.clients,
+                    ))
+            finally:
+                server.terminate()
+                server.wait()
+            latencies = sorted(latency for fast, _ in results for latency in fast)
+            total = len(latencies) + sum(listings for _, listings in results)
+            p95 = latencies[int(len(latencies) * 0.95)]
+            print(f"{f'{workers} x {args.threads}':<18} {total / args.duration:>11.1f} "
+                  f"{statistics.median(latencies) * 1000:>17.1f} ms {p95 * 1000:>6.1f} ms")
+
+def decode_request(server, body):
+    """Parse, validate and deserialize one envelope, without calling the method"""
+    ctx = MethodContext(server, MethodContext.SERVER)
+    ctx.in_string = [body]
+    ctx, = server.generate_contexts(ctx)
+    server.get_in_object(ctx)
+    assert ctx.in_error is None, ctx.in_error
+    return ctx.in_object
+
+def bench_validation(args):
+    servers = {mode: ServerBase(soap_service.make_application(mode)) for mode in soap_service.VALIDATION_MODES}
+    print(f"CreateProducts envelopes, parse + validate + deserialize, best of {args.repeat}")
+    print(f"{'items':>7} {'size':>10} " + " ".join(f"{mode:>10}" for mode in servers) + f" {'XSD check alone':>22}")
+    for items in args.items:
+        products = "".join(
+            f"<tns:ProductIn><tns:name>Product {i}</tns:name><tns:quantity>{i}</tns:quantity>"
+            f"<tns:price>{i * 0.37:.2f}</tns:price></tns:ProductIn>"
+            for i in range(items)
+        )
+        body = soap_envelope("CreateProducts", f"<tns:products>{products}</tns:products>")
+        times = {}
+        for mode, server in servers.items():
+            times[mode], decoded = timed(lambda: decode_request(server, body), args.repeat)
+            assert len(decoded[0]) == items
+        # The schema spyne compiled at startup, applied to an already parsed body
+        schema = servers["lxml"].app.in_protocol.validation_schema
+        request = etree.fromstring(body).find("{http://schemas.xmlsoap.org/soap/envelope/}Body")[0]
+        check, valid = timed(lambda: schema.validate(request), args.repeat)
+        assert valid
+        print(f"{items:>7} {len(body) / 1024:>6.0f} KiB " + " ".join(f"{t * 1000:>7.2f} ms" for t in times.values())
+              + f" {check * 1000:>8.2f} ms {check / items * 1e6:>5.2f} us/item")
+
+def wsgi_post(app, body):
+    environ = {
+        "REQUEST_METHOD": "POST",
+        "CONTENT_TYPE": "text/xml; charset=utf-8",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+    }
+    setup_testing_defaults(environ)
+    return b"".join(app(environ, lambda status, headers, exc_info=None: None))
+
+def bench_cache(args):
+    with tempfile.TemporaryDirectory() as directory:
+        seed_database(directory, args.products)
+        requests_ = {
+            "GetProduct": soap_envelope("GetProduct", "<tns:product_id>7</tns:product_id>"),
+            "GetProductTyped": soap_envelope("GetProductTyped", "<tns:product_id>7</tns:product_id>"),
+            "GetAllProducts": soap_envelope("GetAllProducts"),
+            "GetAllProductsTyped": soap_envelope("GetAllProductsTyped"),
+        }
+        print(f"{args.products} products, best of {args.repeat}")
+        print(f"{'operation':<22} {'uncached':>12} {'cache hit':>12}")
+        for operation, body in requests_.items():
+            uncached, expected = timed(lambda: wsgi_post(soap_service.spyne_application, body), args.repeat)
+            wsgi_post(soap_service.wsgi_application, body)
+            hit, cached = timed(lambda: wsgi_post(soap_service.wsgi_application, body), args.repeat)
+            assert cached == expected
+            print(f"{operation:<22} {uncached * 1000:>9.3f} ms {hit * 1000:>9.3f} ms")
+
+def wsgi_get(app, path, query):
+    environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": query}
+    setup_testing_defaults(environ)
+    return b"".join(app(environ, lambda status, headers, exc_info=None: None))
+
+def bench_protocols(args):
+    import msgpack
+
+    with tempfile.TemporaryDirectory() as directory:
+        seed_database(directory, args.products)
+        ids = list(range(1, args.products + 1, max(1, args.products // 100)))[:100]
+        operations = {
+            "GetProductTyped": ("product_id=7", "<tns:product_id>7</tns:product_id>"),
+            f"GetProductsByIds ({len(ids)})": (
+                "&".join(f"product_ids={i}" for i in ids),
+                "<tns:product_ids>" + "".join(f"<tns:integer>{i}</tns:integer>" for i in ids) + "</tns:product_ids>",
+            ),
+            f"GetAllProductsTyped ({args.products})": ("", ""),
+        }
+        print(f"per call, mean of {args.repeat}; server CPU, client decode CPU, wall time")
+        print(f"{'operation':<28} {'protocol':<8} {'size':>10} {'server':>10} {'decode':>10} {'latency':>10}")
+        for label, (query, soap_args) in operations.items():
+            operation = label.split()[0]
+            protocols = {
+                "soap": (lambda: wsgi_post(soap_service.spyne_application, soap_envelope(operation, soap_args)), etree.fromstring),
+                "json": (lambda: wsgi_get(soap_service.json_application, f"/{operation}", query), json.loads),
+                "msgpack": (lambda: wsgi_get(soap_service.msgpack_application, f"/{operation}", query), msgpack.unpackb),
+            }
+            for protocol, (request, decode) in protocols.items():
+                request()
+                server = client = wall = 0.0
+                for _ in range(args.repeat):
+                    start_wall, start_cpu = time.perf_counter(), time.process_time()
+                    body = request()
+                    middle_cpu = time.process_time()
+                    decode(body)
+                    end_cpu = time.process_time()
+                    wall += time.perf_counter() - start_wall
+                    server += middle_cpu - start_cpu
+                    client += end_cpu - middle_cpu
+                print(f"{label:<28} {protocol:<8} {len(body) / 1024:>6.1f} KiB "
+                      f"{server / args.repeat * 1000:>7.2f} ms {client / args.repeat * 1000:>7.2f} ms "
+                      f"{wall / args.repeat * 1000:>7.2f} ms")
+
+def bench_compression(args):
+    with tempfile.TemporaryDirectory() as directory:
+        seed_database(directory, args.products)
+        # Cache off: every listing is queried, serialized and (maybe) compressed
+        server, port = start_server(f"sqlite:///{directory}/bench.db", env={"SOAP_CACHE_BYTES": "0"})
+        url = f"http://localhost:{port}/"
+        try:
+            listing = soap_envelope("GetAllProductsTyped")
+            print(f"GetAllProductsTyped, {args.products} products over a real socket, mean of {args.repeat}")
+            print(f"{'Accept-Encoding':<16} {'on the wire':>12} {'latency':>10} {f'+ wire at {args.mbit} Mbit/s':>22}")
+            for accept in ("identity", "gzip"):
+                wire = elapsed = 0.0
+                with requests.Session() as session:
+                    for _ in range(args.repeat):
+                        start = time.perf_counter()
+                        response = session.post(url, data=listing, stream=True, headers={
+                            "Content-Type": "text/xml; charset=utf-8", "Accept-Encoding": accept,
+                        })
+                        raw = response.raw.read(decode_content=False)
+                        if accept == "gzip":
+                            assert response.headers["Content-Encoding"] == "gzip"
+                            etree.fromstring(gzip.decompress(raw))
+                        else:
+                            etree.fromstring(raw)
+                        elapsed += time.perf_counter() - start
+                        wire += len(raw)
+                wire, elapsed = wire / args.repeat, elapsed / args.repeat
+                print(f"{accept:<16} {wire / 1024:>8.0f} KiB {elapsed * 1000:>7.1f} ms "
+                      f"{(elapsed + wire * 8 / (args.mbit * 1e6)) * 1000:>19.1f} ms")
+
+            print(f"\nzeep client, GetAllProductsTyped and CreateProducts ({args.items} items), mean of {args.repeat}")
+            items = [{"name": f"New {i}", "quantity": i, "price": 2.5} for i in range(args.items)]
+            plain = Transport()
+            plain.session.headers["Accept-Encoding"] = "identity"
+            clients = {
+                "plain Transport": Client(f"{url}?wsdl", transport=plain),
+                "CompressingTransport": Client(f"{url}?wsdl", transport=CompressingTransport()),
+            }
+            # All reads first, so both clients list the same number of rows
+            reads = {}
+            for label, client in clients.items():
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    client.service.GetAllProductsTyped()
+                reads[label] = (time.perf_counter() - start) / args.repeat
+            for label, client in clients.items():
+                start = time.perf_counter()
+                for _ in range(args.repeat):
+                    client.service.CreateProducts({"ProductIn": items})
+                write = (time.perf_counter() - start) / args.repeat
+                print(f"{label:<22} listing {reads[label] * 1000:>7.1f} ms   batch create {write * 1000:>7.1f} ms")
+            body = soap_envelope("CreateProducts", "<tns:products>" + "".join(
+                f"<tns:ProductIn><tns:name>New {i}</tns:name><tns:quantity>{i}</tns:quantity>"
+                f"<tns:price>2.5</tns:price></tns:ProductIn>" for i in range(args.items)
+            ) + "</tns:products>")
+            print(f"CreateProducts request body: {len(body) / 1024:.0f} KiB plain, "
+                  f"{len(gzip.compress(body, 6)) / 1024:.0f} KiB gzipped")
+        finally:
+            server.terminate()
+            server.wait()
+
+def bench_client(args):
+    with tempfile.TemporaryDirectory() as directory:
+        seed_database(directory, 100)
+        database_url = f"sqlite:///{directory}/bench.db"
+        servers = {
+            "one request per connection": start_server(database_url, env={"SOAP_KEEP_ALIVE": "0"}),
+            "keep-alive": start_server(database_url, env={"SOAP_KEEP_ALIVE": "30"}),
+        }
+        try:
+            url = f"http://localhost:{servers['keep-alive'][1]}/?wsdl"
+            cache_path = os.path.join(directory, "wsdl.db")
+            make_client(url, cache_path)
+            def stale():
+                # Past its max-age, the cached WSDL is revalidated (a 304) before use
+                SqliteCache(path=cache_path).add(f"expires:{url}", b"0")
+
+            print(f"zeep client startup, best of {args.repeat}")
+            for label, path, setup in (("WSDL downloaded", None, None),
+                                       ("WSDL cached, revalidated", cache_path, stale),
+                                       ("WSDL cached, fresh", cache_path, None)):
+                startup, _ = timed(lambda: make_client(url, path), args.repeat, setup)
+                print(f"{label:<28} {startup * 1000:>8.1f} ms")
+
+            print(f"\nGetProductTyped, {args.calls} sequential calls")
+            print(f"{'server':<28} {'client':<22} {'p50':>9} {'p95':>9}")
+            for server_label, (_, port) in servers.items():
+                url = f"http://localhost:{port}/?wsdl"
+                # Connection: close on every call is what the old server forced
+                closing = make_client(url, cache_path)
+                closing.transport.session.headers["Connection"] = "close"
+                for client_label, client in (("new connection per call", closing),
+                                             ("pooled session", make_client(url, cache_path))):
+                    latencies = []
+                    for i in range(args.calls):
+                        start = time.perf_counter()
+                        client.service.GetProductTyped(i % 100 + 1)
+                        latencies.append(time.perf_counter() - start)
+                    latencies.sort()
+                    print(f"{server_label:<28} {client_label:<22} "
+                          f"{statistics.median(latencies) * 1000:>6.2f} ms "
+                          f"{latencies[int(len(latencies) * 0.95)] * 1000:>6.2f} ms")
+        finally:
+            for server, _ in servers.values():
+                server.terminate()
+                server.wait()
+
+def timed(function, repeat, setup=None):
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    typed = commands.add_parser("typed", help="string vs ProductType listings, server and client CPU")
+    typed.add_argument("--products", type=int, default=10000)
+    typed.add_argument("--repeat", type=int, default=5)
+    typed.set_defaults(run=bench_typed)
+
+    batch = commands.add_parser("batch", help="one call per product vs one CreateProducts call")
+    batch.add_argument("--products", type=int, default=1000)
+    batch.set_defaults(run=bench_batch)
+
+    by_ids = commands.add_parser("by-ids", help="one GetProduct call per id vs one GetProductsByIds call")
+    by_ids.add_argument("--ids", type=int, default=500)
+    by_ids.set_defaults(run=bench_by_ids)
+
+    server = commands.add_parser("server", help="throughput of soap_server.py over real sockets")
+    server.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    server.add_argument("--threads", type=int, default=4)
+    server.add_argument("--clients", type=int, default=16)
+    server.add_argument("--duration", type=float, default=10)
+    server.add_argument("--products", type=int, default=2000)
+    server.add_argument("--listing-every", type=int, default=50)
+    server.set_defaults(run=bench_server)
+
+    validation = commands.add_parser("validation", help="per-envelope cost of each SOAP_VALIDATION mode by payload size")
+    validation.add_argument("--items", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    validation.add_argument("--repeat", type=int, default=5)
+    validation.set_defaults(run=bench_validation)
+
+    cache = commands.add_parser("cache", help="read operations with and without the response cache")
+    cache.add_argument("--products", type=int, default=10000)
+    cache.add_argument("--repeat", type=int, default=20)
+    cache.set_defaults(run=bench_cache)
+
+    protocols = commands.add_parser("protocols", help="the same operations over SOAP, JSON and MessagePack")
+    protocols.add_argument("--products", type=int, default=10000)
+    protocols.add_argument("--repeat", type=int, default=20)
+    protocols.set_defaults(run=bench_protocols)
+
+    compression = commands.add_parser("compression", help="gzip bandwidth and latency for listings and batch writes")
+    compression.add_argument("--products", type=int, default=20000)
+    compression.add_argument("--items", type=int, default=2000)
+    compression.add_argument("--repeat", type=int, default=5)
+    compression.add_argument("--mbit", type=float, default=100, help="link speed for the wire-time estimate")
+    compression.set_defaults(run=bench_compression)
+
+    client = commands.add_parser("client", help="zeep startup with a WSDL cache, per-call latency with keep-alive")
+    client.add_argument("--calls", type=int, default=500)
+    client.add_argument("--repeat", type=int, default=5)
+    client.set_defaults(run=bench_client)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
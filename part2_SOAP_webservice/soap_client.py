@@ -1,15 +1,428 @@
 # soap_client.py
+"""SOAP client: an interactive menu, or batch subcommands for data at volume
+
+    python soap_client.py
+    python soap_client.py import products.csv --concurrency 8
+    python soap_client.py export products.ndjson
+    python soap_client.py get-many ids.csv --output found.ndjson
+    python soap_client.py delete-many ids.ndjson
+
+Input and output are CSV or NDJSON, chosen by file extension (--format
+overrides it; "-" is stdin/stdout). Batches of --batch-size items are sent
+--concurrency at a time, through the batch operations when the server has
+them and one call per item otherwise.
+"""
+from requests import Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, RequestException, Timeout
 from zeep import Client
+from zeep.cache import SqliteCache
+from zeep.exceptions import TransportError
+from zeep.helpers import serialize_object
+from zeep.transports import Transport
+from werkzeug.datastructures import ResponseCacheControl
+from werkzeug.http import parse_cache_control_header
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+import argparse
+import csv
+import gzip
+import itertools
+import json
+import os
+import random
 import sys
+import time
+
+WSDL_URL = os.getenv("SOAP_WSDL_URL", "http://localhost:8000/?wsdl")
+# The parsed WSDL isn't picklable, so the cache keeps the WSDL and XSD
+# documents instead. While the server's Cache-Control max-age says they are
+# fresh, startup reads them without a request; after that it revalidates them
+# with their ETag (a bodyless 304 while unchanged). The cached copy is also
+# used when the server can't be reached
+WSDL_CACHE = os.getenv("SOAP_WSDL_CACHE", os.path.expanduser("~/.cache/inventory_soap/wsdl.db"))
+WSDL_CACHE_TTL = int(os.getenv("SOAP_WSDL_CACHE_TTL", str(24 * 3600)))
+CONNECT_TIMEOUT = float(os.getenv("SOAP_CONNECT_TIMEOUT", "3"))
+READ_TIMEOUT = float(os.getenv("SOAP_READ_TIMEOUT", "30"))
+# Kept-alive connections per host; one per thread making calls is enough
+POOL_SIZE = int(os.getenv("SOAP_POOL_SIZE", "8"))
+
+# Request envelopes at least this big are sent gzip-compressed
+COMPRESS_REQUESTS_OVER = 16 * 1024
+
+class CompressingTransport(Transport):
+    """zeep transport that asks for gzip responses and gzips large requests
+
+    Cached WSDL and XSD documents are used without a request for as long as
+    the server's max-age allows, then revalidated, rather than trusted for
+    the cache's whole TTL.
+    """
+
+    def __init__(self, *args, min_size=COMPRESS_REQUESTS_OVER, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+        self.session.headers["Accept-Encoding"] = "gzip"
+
+    def post(self, address, message, headers):
+        if len(message) >= self.min_size:
+            message = gzip.compress(message, compresslevel=6)
+            headers = {**headers, "Content-Encoding": "gzip"}
+        return super().post(address, message, headers)
+
+    def load(self, url):
+        if not self.cache or not url.startswith(("http://", "https://")):
+            return super().load(url)
+        content, expires = self.cache.get(url), self.cache.get(f"expires:{url}")
+        if content and expires and float(expires) > time.time():
+            return bytes(content)
+        etag = self.cache.get(f"etag:{url}")
+        headers = {"If-None-Match": etag.decode()} if content and etag else {}
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.load_timeout)
+            with closing(response):
+                if response.status_code == 304:
+                    self._keep_fresh(url, response.headers)
+                    return bytes(content)
+                response.raise_for_status()
+        except RequestException:
+            if content:
+                return bytes(content)
+            raise
+        self.cache.add(url, response.content)
+        if "ETag" in response.headers:
+            self.cache.add(f"etag:{url}", response.headers["ETag"].encode())
+        self._keep_fresh(url, response.headers)
+        return response.content
+
+    def _keep_fresh(self, url, headers):
+        """Record until when the cached copy of url may be used without asking the server"""
+        cache_control = parse_cache_control_header(headers.get("Cache-Control"), cls=ResponseCacheControl)
+        max_age = 0 if cache_control.no_cache or cache_control.no_store else cache_control.max_age or 0
+        self.cache.add(f"expires:{url}", str(time.time() + max_age).encode())
+
+def make_session(pool_size=POOL_SIZE):
+    """requests session reusing up to pool_size keep-alive connections per host"""
+    session = Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def make_client(wsdl_url=WSDL_URL, cache_path=WSDL_CACHE, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                pool_size=POOL_SIZE):
+    """zeep client with an on-disk WSDL cache (None: no cache) and a pooled session"""
+    cache = None
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        cache = SqliteCache(path=cache_path, timeout=WSDL_CACHE_TTL)
+    transport = CompressingTransport(
+        cache=cache,
+        session=make_session(pool_size),
+        timeout=timeout,
+        operation_timeout=timeout,
+    )
+    return Client(wsdl_url, transport=transport)
+
+
+# Batch mode
+BATCH_SIZE = 500
+CONCURRENCY = 4
+RETRIES = 3
+BACKOFF_SECONDS = 0.5
+PAGE_SIZE = 1000
+PRODUCT_FIELDS = ("id", "name", "quantity", "price")
+FIELD_TYPES = {"id": int, "name": str, "quantity": int, "price": float}
+
+def record_format(path, format=None):
+    if format:
+        return format
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+def open_path(path, mode):
+    if path == "-":
+        return open((sys.stdin if "r" in mode else sys.stdout).fileno(), mode,
+                    encoding="utf-8", newline="", closefd=False)
+    return open(path, mode, encoding="utf-8", newline="")
+
+class InvalidRecord:
+    """An input row that couldn't be read, reported as a failure of its batch"""
+
+    def __init__(self, raw, message):
+        self.raw = raw
+        self.message = message
+
+def parse_record(row):
+    if not isinstance(row, dict):
+        row = {"id": row}
+    return {
+        field: None if row.get(field) in (None, "") else convert(row[field])
+        for field, convert in FIELD_TYPES.items()
+        if field in row
+    }
+
+def read_records(path, format=None):
+    """Yield one dict per CSV row or NDJSON line; a bare NDJSON number is {"id": n}
+
+    A row that isn't valid JSON or has a non-numeric field is yielded as an
+    InvalidRecord, so the rest of the input still runs.
+    """
+    with open_path(path, "r") as stream:
+        if record_format(path, format) == "csv":
+            reader = csv.DictReader(stream)
+            rows = ((reader.line_num, row) for row in reader)
+        else:
+            rows = ((number, line.strip()) for number, line in enumerate(stream, 1) if line.strip())
+        for number, row in rows:
+            try:
+                yield parse_record(json.loads(row) if isinstance(row, str) else row)
+            except (TypeError, ValueError) as e:
+                yield InvalidRecord(row, f"Error: line {number}: {e}")
+
+def record_ids(records):
+    """The id of each record; a record without one becomes an InvalidRecord"""
+    for record in records:
+        if isinstance(record, InvalidRecord):
+            yield record
+        elif record.get("id") is None:
+            yield InvalidRecord(record, "Error: Record has no id")
+        else:
+            yield record["id"]
+
+class RecordWriter:
+    """Writes product dicts as CSV or NDJSON"""
+
+    def __init__(self, path, format=None):
+        self.stream = open_path(path, "w")
+        self.csv = None
+        if record_format(path, format) == "csv":
+            self.csv = csv.DictWriter(self.stream, PRODUCT_FIELDS, extrasaction="ignore")
+            self.csv.writeheader()
+
+    def write(self, product):
+        if self.csv:
+            self.csv.writerow(product)
+        else:
+            self.stream.write(json.dumps({field: product[field] for field in PRODUCT_FIELDS}) + "\n")
+
+    def close(self):
+        self.stream.close()
+
+def batched(items, size):
+    items = iter(items)
+    while batch := list(itertools.islice(items, size)):
+        yield batch
+
+def is_retryable(error, idempotent):
+    """Whether a failed call can be sent again
 
-def main():
-    # Connect to SOAP service
-    client = Client('http://localhost:8000/?wsdl')
-    
+    A timeout or dropped connection after the request went out may have
+    been applied already, so writes that aren't idempotent only retry
+    when the request never reached the server.
+    """
+    if isinstance(error, ConnectTimeout):
+        return True
+    if isinstance(error, TransportError):
+        return error.status_code in (429, 503) or (idempotent and error.status_code >= 500)
+    return idempotent and isinstance(error, (ConnectionError, Timeout))
+
+def call_with_retry(operation, *args, retries=RETRIES, backoff=BACKOFF_SECONDS, idempotent=True):
+    """Call operation, retrying with jittered exponential backoff"""
+    for attempt in itertools.count():
+        try:
+            return operation(*args)
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e, idempotent):
+                raise
+            time.sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+class Progress:
+    """Running count and throughput on stderr, at most once per interval"""
+
+    def __init__(self, label, interval=1.0, stream=sys.stderr):
+        self.label = label
+        self.interval = interval
+        self.stream = stream
+        self.done = self.failed = 0
+        self.start = self.last = time.monotonic()
+
+    def add(self, done, failed=0):
+        self.done += done
+        self.failed += failed
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            self.report(now, end="\r")
+
+    def report(self, now=None, end="\n"):
+        elapsed = (now or time.monotonic()) - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        print(f"{self.label}: {self.done} done, {self.failed} failed, "
+              f"{elapsed:.1f}s, {rate:.0f} items/s", end=end, file=self.stream, flush=True)
+
+def run_batches(batches, handle, concurrency=CONCURRENCY):
+    """Yield (batch, handle(batch)) in order, with at most concurrency calls running
+
+    Only concurrency batches are read ahead, so the input streams through.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = deque()
+        for batch in batches:
+            pending.append((batch, pool.submit(handle, batch)))
+            if len(pending) >= concurrency:
+                batch, future = pending.popleft()
+                yield batch, future.result()
+        while pending:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+
+def report_failure(item, message):
+    print(f"Failed {json.dumps(item)}: {message}", file=sys.stderr)
+
+class BatchClient:
+    """Batch subcommands over a zeep client, shared by the worker threads"""
+
+    def __init__(self, client, concurrency=CONCURRENCY, batch_size=BATCH_SIZE,
+                 retries=RETRIES, backoff=BACKOFF_SECONDS):
+        self.client = client
+        self.service = client.service
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.retries = retries
+        self.backoff = backoff
+
+    def has_operation(self, name):
+        return hasattr(self.service, name)
+
+    def call(self, name, *args, idempotent=True):
+        return call_with_retry(self.service[name], *args, retries=self.retries,
+                               backoff=self.backoff, idempotent=idempotent)
+
+    def run(self, label, items, handle, writer=None):
+        """Run handle over batches of items and return the Progress
+
+        handle returns (products, failures); products are written here, in
+        this thread and in input order. InvalidRecords never reach handle,
+        and a batch whose call raises fails as a whole rather than ending
+        the command.
+        """
+        def guarded(batch):
+            invalid = [(item.raw, item.message) for item in batch if isinstance(item, InvalidRecord)]
+            batch = [item for item in batch if not isinstance(item, InvalidRecord)]
+            if not batch:
+                return [], invalid
+            try:
+                products, failures = handle(batch)
+            except Exception as e:
+                return [], invalid + [(item, f"Error: {e}") for item in batch]
+            return products, invalid + failures
+
+        progress = Progress(label)
+        for batch, (products, failures) in run_batches(
+            batched(items, self.batch_size), guarded, self.concurrency
+        ):
+            for product in products:
+                writer.write(product)
+            progress.add(len(batch), len(failures))
+            for item, message in failures:
+                report_failure(item, message)
+        progress.report()
+        return progress
+
+    # import: rows with an id update that product, rows without one create one
+    def import_products(self, records):
+        return self.run("import", records, self._import_batch)
+
+    def _import_batch(self, batch):
+        creates = [record for record in batch if record.get("id") is None]
+        updates = [record for record in batch if record.get("id") is not None]
+        failures = []
+        if creates:
+            failures += self._write_batch(
+                creates, "CreateProducts", "ProductIn",
+                lambda r: {"name": r.get("name"), "quantity": r.get("quantity"), "price": r.get("price")},
+                "CreateProduct", lambda r: (r.get("name"), r.get("quantity"), r.get("price")),
+                idempotent=False,
+            )
+        if updates:
+            # UpdateProducts replaces every field; partial rows go one by one
+            full = [r for r in updates if all(r.get(field) is not None for field in PRODUCT_FIELDS)]
+            partial = [r for r in updates if any(r.get(field) is None for field in PRODUCT_FIELDS)]
+            if full:
+                failures += self._write_batch(
+                    full, "UpdateProducts", "ProductType", lambda r: {f: r[f] for f in PRODUCT_FIELDS},
+                    "UpdateProduct", lambda r: (r["id"], r["name"], r["quantity"], r["price"]),
+                )
+            for r in partial:
+                result = self.call("UpdateProduct", r["id"], r.get("name"), r.get("quantity"), r.get("price"))
+                if result.startswith("Error"):
+                    failures.append((r, result))
+        return [], failures
+
+    def _write_batch(self, records, batch_operation, item_type, as_item,
+                     single_operation, as_args, idempotent=True):
+        if self.has_operation(batch_operation):
+            statuses = self.call(batch_operation, {item_type: [as_item(r) for r in records]},
+                                 idempotent=idempotent)
+            return [(records[s.index], s.message) for s in statuses if not s.success]
+        failures = []
+        for record in records:
+            result = self.call(single_operation, *as_args(record), idempotent=idempotent)
+            if result.startswith("Error"):
+                failures.append((record, result))
+        return failures
+
+    def delete_many(self, records):
+        return self.run("delete-many", record_ids(records), self._delete_batch)
+
+    def _delete_batch(self, ids):
+        if self.has_operation("DeleteProducts"):
+            statuses = self.call("DeleteProducts", {"integer": ids})
+            return [], [(ids[s.index], s.message) for s in statuses if not s.success]
+        failures = []
+        for product_id in ids:
+            result = self.call("DeleteProduct", product_id)
+            if result.startswith("Error"):
+                failures.append((product_id, result))
+        return [], failures
+
+    def get_many(self, records, writer):
+        return self.run("get-many", record_ids(records), self._get_batch, writer)
+
+    def _get_batch(self, ids):
+        """(found products as dicts, [(missing id, message)])"""
+        if self.has_operation("GetProductsByIds"):
+            lookups = self.call("GetProductsByIds", {"integer": ids})
+            products = [serialize_object(l.product, dict) for l in lookups if l.found]
+            missing = [l.id for l in lookups if not l.found]
+        else:
+            # An unknown id comes back as no product at all
+            found = [serialize_object(self.call("GetProductTyped", i), dict) for i in ids]
+            products = [p for p in found if p is not None and p["id"] is not None]
+            missing = [i for i, p in zip(ids, found) if p is None or p["id"] is None]
+        return products, [(i, "Error: Product not found") for i in missing]
+
+    def export(self, writer, page_size=PAGE_SIZE):
+        """Page through every product with the GetProductsPage cursor"""
+        progress = Progress("export")
+        after_id = None
+        while True:
+            page = self.call("GetProductsPage", after_id, page_size)
+            products = page.products.ProductType if page.products else []
+            for product in products:
+                writer.write(serialize_object(product, dict))
+            progress.add(len(products))
+            if page.next_after_id is None:
+                break
+            after_id = page.next_after_id
+        progress.report()
+        return progress
+
+def interactive(client):
     while True:
         print("\n=== SOAP CLIENT ===")
         print("1. Get all products")
-        print("2. Get product by ID")
+        print("2. Get product(s) by ID")
         print("3. Create product")
         print("4. Update product")
         print("5. Delete product")
@@ -28,9 +441,18 @@ def main():
                 
         elif choice == '2':
             try:
-                product_id = int(input("Enter product ID: "))
-                result = client.service.GetProduct(product_id)
-                print(f"Result: {result}")
+                product_ids = [int(i) for i in input("Enter product ID(s), comma separated: ").split(",")]
+                if len(product_ids) == 1:
+                    result = client.service.GetProduct(product_ids[0])
+                    print(f"Result: {result}")
+                else:
+                    # One round trip and one query for all of them
+                    for lookup in client.service.GetProductsByIds({"integer": product_ids}):
+                        if lookup.found:
+                            product = lookup.product
+                            print(f"  - Product {product.id}: {product.name}, Quantity: {product.quantity}, Price: ${product.price:.2f}")
+                        else:
+                            print(f"  - Product {lookup.id}: not found")
             except Exception as e:
                 print(f"Error: {e}")
                 
@@ -48,9 +470,12 @@ def main():
         elif choice == '4':
             try:
                 product_id = int(input("Product ID to update: "))
-                name = input("New name: ")
-                quantity = int(input("New quantity: "))
-                price = float(input("New price: "))
+                # Leave a field blank to keep its current value
+                name = input("New name: ") or None
+                quantity = input("New quantity: ")
+                quantity = int(quantity) if quantity else None
+                price = input("New price: ")
+                price = float(price) if price else None
                 
                 result = client.service.UpdateProduct(product_id, name, quantity, price)
                 print(f"Result: {result}")
@@ -72,5 +497,52 @@ def main():
         else:
             print("Invalid option")
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wsdl", default=WSDL_URL)
+    parser.add_argument("--wsdl-cache", default=WSDL_CACHE, help='WSDL cache file ("" for none)')
+    commands = parser.add_subparsers(dest="command")
+    for name, help, source in (
+        ("import", "create products (rows without an id) and update them (rows with one)", "products"),
+        ("export", "write every product", None),
+        ("get-many", "write the products with the given ids", "ids"),
+        ("delete-many", "delete the products with the given ids", "ids"),
+    ):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("path", nargs="?", default="-",
+                             help=f"{source} file (default stdin)" if source else "output file (default stdout)")
+        command.add_argument("--format", choices=("csv", "ndjson"))
+        command.add_argument("--concurrency", type=int, default=CONCURRENCY, help="calls in flight")
+        command.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="items per call")
+        command.add_argument("--retries", type=int, default=RETRIES)
+        if name == "get-many":
+            command.add_argument("--output", default="-")
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        # Connect to SOAP service
+        interactive(make_client(args.wsdl, args.wsdl_cache))
+        return 0
+
+    client = BatchClient(make_client(args.wsdl, args.wsdl_cache, pool_size=args.concurrency), args.concurrency,
+                         args.batch_size, args.retries)
+    if args.command == "export":
+        writer = RecordWriter(args.path, args.format)
+        try:
+            progress = client.export(writer, args.batch_size)
+        finally:
+            writer.close()
+    elif args.command == "get-many":
+        writer = RecordWriter(args.output, args.format)
+        try:
+            progress = client.get_many(read_records(args.path, args.format), writer)
+        finally:
+            writer.close()
+    elif args.command == "import":
+        progress = client.import_products(read_records(args.path, args.format))
+    else:
+        progress = client.delete_many(read_records(args.path, args.format))
+    return 1 if progress.failed else 0
+
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
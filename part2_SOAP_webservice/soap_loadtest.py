@@ -0,0 +1,352 @@
+# soap_loadtest.py
+"""Load generator for the SOAP service: sustained throughput and tail latency
+
+    python soap_loadtest.py read-heavy listing write-heavy --duration 30 --output results.json
+    python soap_loadtest.py read-heavy --rate 200 --baseline results.json
+    python soap_loadtest.py write-heavy --database-url postgresql://inventory:pw@localhost/loadtest
+
+The service runs in this process on an ephemeral port (soap_server's
+threaded, keep-alive server) against a freshly seeded database: a SQLite
+file by default, or --database-url, whose tables are dropped and recreated.
+Each client thread keeps one connection open.
+
+With --concurrency alone, that many clients send back to back (closed
+loop). With --rate, requests are started on a fixed schedule whatever the
+latency (open loop) and latency counts from the scheduled start, so a
+stalled server shows up in the percentiles instead of slowing the load.
+Runs are reproducible for a given --seed.
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import insert
+
+import soap_server
+import soap_service
+from soap_service import Base, Product
+
+def envelope(operation, body=""):
+    return (
+        '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+        f'xmlns:tns="inventory.soap"><soapenv:Body><tns:{operation}>{body}</tns:{operation}>'
+        "</soapenv:Body></soapenv:Envelope>"
+    ).encode()
+
+def get_product(rng, products):
+    return envelope("GetProduct", f"<tns:product_id>{rng.randint(1, products)}</tns:product_id>")
+
+def get_product_typed(rng, products):
+    return envelope("GetProductTyped", f"<tns:product_id>{rng.randint(1, products)}</tns:product_id>")
+
+def get_all_products(rng, products):
+    return envelope("GetAllProducts")
+
+def create_product(rng, products):
+    return envelope("CreateProduct", f"<tns:name>Load {rng.randrange(10 ** 6)}</tns:name>"
+                    f"<tns:quantity>{rng.randint(0, 500)}</tns:quantity><tns:price>9.99</tns:price>")
+
+def update_product(rng, products):
+    return envelope("UpdateProduct", f"<tns:product_id>{rng.randint(1, products)}</tns:product_id>"
+                    f"<tns:quantity>{rng.randint(0, 500)}</tns:quantity>")
+
+# Each scenario: rows seeded, (weight, operation, request builder) choices,
+# and whether the response cache may answer (--no-cache turns it off for all)
+SCENARIOS = {
+    "read-heavy": {
+        "products": 10000,
+        "mix": [(80, "GetProduct", get_product), (15, "GetProductTyped", get_product_typed),
+                (5, "UpdateProduct", update_product)],
+    },
+    "listing": {
+        "products": 10000,
+        "mix": [(100, "GetAllProducts", get_all_products)],
+        # Every request is the same one: with the cache this would time hits
+        "cache": False,
+    },
+    "write-heavy": {
+        "products": 10000,
+        "mix": [(45, "CreateProduct", create_product), (45, "UpdateProduct", update_product),
+                (10, "GetProduct", get_product)],
+    },
+}
+
+def seed(database_url, products, pool_size):
+    """Recreate the tables with products rows and point the service at them"""
+    engine = soap_server.bind_engine(database_url, pool_size)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for start in range(0, products, 5000):
+            conn.execute(insert(Product), [
+                {"name": f"Product {i}", "quantity": i % 500, "price": round(i * 0.37, 2)}
+                for i in range(start, min(start + 5000, products))
+            ])
+    soap_service.response_cache.clear()
+    return engine
+
+def start_server(threads, cache=True):
+    # Without the cache, requests go straight to spyne (no gzip either,
+    # which the load generator doesn't ask for anyway)
+    app = soap_service.wsgi_application if cache else soap_service.spyne_application
+    server = soap_server.make_server("localhost", 0, app, threads=threads)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class Client:
+    """One kept-alive connection; reconnects after errors"""
+
+    def __init__(self, port):
+        self.port = port
+        self.conn = None
+
+    def send(self, body):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection("localhost", self.port, timeout=60)
+        try:
+            self.conn.request("POST", "/", body, {"Content-Type": "text/xml; charset=utf-8"})
+            response = self.conn.getresponse()
+            response.read()
+            if response.getheader("Connection") == "close":
+                self.close()
+            return response.status == 200
+        except (OSError, http.client.HTTPException):
+            self.close()
+            return False
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class Recorder:
+    """Latencies and errors per operation, from every client thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def add(self, operation, latency, ok):
+        with self.lock:
+            self.latencies.setdefault(operation, []).append(latency)
+            if not ok:
+                self.errors[operation] = self.errors.get(operation, 0) + 1
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+def summarize(latencies, errors, duration):
+    ordered = sorted(latencies)
+    ms = lambda seconds: None if seconds is None else round(seconds * 1000, 3)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput": round(len(ordered) / duration, 1),
+        "latency_ms": {
+            "p50": ms(percentile(ordered, 0.50)),
+            "p95": ms(percentile(ordered, 0.95)),
+            "p99": ms(percentile(ordered, 0.99)),
+            "max": ms(ordered[-1] if ordered else None),
+        },
+    }
+
+def choose(rng, mix):
+    pick = rng.uniform(0, sum(weight for weight, _, _ in mix))
+    for weight, operation, build in mix:
+        pick -= weight
+        if pick <= 0:
+            break
+    return operation, build
+
+def closed_loop(port, mix, products, concurrency, duration, seed, recorder):
+    """concurrency clients, each sending its next request as soon as the last one is answered"""
+    deadline = time.perf_counter() + duration
+
+    def run(worker):
+        rng = random.Random(seed * 1000 + worker)
+        client = Client(port)
+        try:
+            while time.perf_counter() < deadline:
+                operation, build = choose(rng, mix)
+                body = build(rng, products)
+                start = time.perf_counter()
+                ok = client.send(body)
+                recorder.add(operation, time.perf_counter() - start, ok)
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=run, args=(worker,)) for worker in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def open_loop(port, mix, products, rate, concurrency, duration, seed, recorder):
+    """rate requests per second on a fixed schedule, at most concurrency in flight"""
+    rng = random.Random(seed)
+    local = threading.local()
+    clients = []
+
+    def send(operation, body, scheduled):
+        if not hasattr(local, "client"):
+            local.client = Client(port)
+            clients.append(local.client)
+        ok = local.client.send(body)
+        # From the scheduled start: time spent queued for a free client counts
+        recorder.add(operation, time.perf_counter() - scheduled, ok)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i in range(int(rate * duration)):
+            scheduled = start + i / rate
+            operation, build = choose(rng, mix)
+            body = build(rng, products)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, operation, body, scheduled)
+    for client in clients:
+        client.close()
+
+def run_scenario(name, args, database_url):
+    scenario = SCENARIOS[name]
+    products = args.products or scenario["products"]
+    cache = scenario.get("cache", True) and not args.no_cache
+    engine = seed(database_url, products, args.threads)
+    server = start_server(args.threads, cache=cache)
+    port = server.server_port
+    try:
+        drive = lambda duration, recorder: (
+            open_loop(port, scenario["mix"], products, args.rate, args.concurrency, duration, args.seed, recorder)
+            if args.rate else
+            closed_loop(port, scenario["mix"], products, args.concurrency, duration, args.seed, recorder)
+        )
+        if args.warmup:
+            drive(args.warmup, Recorder())
+        recorder = Recorder()
+        start = time.perf_counter()
+        drive(args.duration, recorder)
+        elapsed = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        server.server_close()
+        engine.dispose()
+
+    everything = [latency for latencies in recorder.latencies.values() for latency in latencies]
+    result = summarize(everything, sum(recorder.errors.values()), elapsed)
+    result.update({
+        "products": products,
+        "mode": "open" if args.rate else "closed",
+        "rate": args.rate,
+        "concurrency": args.concurrency,
+        "server_threads": args.threads,
+        "duration": round(elapsed, 2),
+        "cache": cache,
+        "operations": {
+            operation: summarize(latencies, recorder.errors.get(operation, 0), elapsed)
+            for operation, latencies in sorted(recorder.latencies.items())
+        },
+    })
+    return result
+
+def report(name, result):
+    latency = result["latency_ms"]
+    print(f"{name:<18} {result['throughput']:>10.1f} {latency['p50']:>9.2f} {latency['p95']:>9.2f} "
+          f"{latency['p99']:>9.2f} {result['errors']:>7}")
+    for operation, stats in result["operations"].items():
+        latency = stats["latency_ms"]
+        print(f"  {operation:<16} {stats['throughput']:>10.1f} {latency['p50']:>9.2f} "
+              f"{latency['p95']:>9.2f} {latency['p99']:>9.2f} {stats['errors']:>7}")
+
+def compare(results, baseline, tolerance):
+    """Print the change against baseline; return the scenarios that regressed beyond tolerance"""
+    regressions = []
+    print(f"\n{'vs baseline':<18} {'throughput':>11} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, result in results.items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            print(f"{name:<18} (not in baseline)")
+            continue
+        load = ("mode", "rate", "concurrency", "products", "cache")
+        if any(result[key] != before.get(key) for key in load):
+            # Different load, so the numbers aren't comparable
+            print(f"{name:<18} (baseline ran a different load: "
+                  + ", ".join(f"{key}={before.get(key)}" for key in load) + ")")
+            continue
+        change = lambda now, then: (now - then) / then if then else 0.0
+        throughput = change(result["throughput"], before["throughput"])
+        latency = {p: change(result["latency_ms"][p], before["latency_ms"][p]) for p in ("p50", "p95", "p99")}
+        print(f"{name:<18} {throughput:>+10.1%} " + " ".join(f"{latency[p]:>+8.1%}" for p in ("p50", "p95", "p99")))
+        if throughput < -tolerance or latency["p99"] > tolerance or result["errors"] > before["errors"]:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument("--concurrency", type=int, default=8, help="clients (open loop: most requests in flight)")
+    parser.add_argument("--rate", type=float, default=None, help="requests/s on a fixed schedule (open loop)")
+    parser.add_argument("--duration", type=float, default=20, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=3, help="unmeasured seconds before each scenario")
+    parser.add_argument("--threads", type=int, default=soap_server.THREADS, help="server request threads")
+    parser.add_argument("--products", type=int, default=None, help="rows to seed (default: per scenario)")
+    parser.add_argument("--database-url", default=None, help="default: a temporary SQLite file")
+    parser.add_argument("--no-cache", action="store_true", help="serve without the response cache")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results here as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed throughput drop / p99 rise against the baseline")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = args.database_url or f"sqlite:///{directory}/loadtest.db"
+        mode = f"{args.rate:g} requests/s, up to {args.concurrency} in flight" if args.rate \
+            else f"{args.concurrency} clients back to back"
+        print(f"{mode}, {args.duration:g}s per scenario, {os.cpu_count()} CPU(s), "
+              f"{database_url.split(':')[0]}")
+        print(f"{'scenario':<18} {'requests/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for name in args.scenarios or SCENARIOS:
+            results[name] = run_scenario(name, args, database_url)
+            report(name, results[name])
+
+    if args.output:
+        with open(args.output, "w") as stream:
+            json.dump({
+                "environment": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "cpus": os.cpu_count(),
+                    "database": (args.database_url or "sqlite").split(":")[0],
+                },
+                "seed": args.seed,
+                "scenarios": results,
+            }, stream, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as stream:
+            regressions = compare(results, json.load(stream), args.tolerance)
+        if regressions:
+            print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
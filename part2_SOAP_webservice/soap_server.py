@@ -0,0 +1,277 @@
+# soap_server.py
+"""Production launcher for the SOAP service: pre-forked workers, each with a thread pool
+
+    python soap_server.py --host 0.0.0.0 --port 8000 --workers 4 --threads 8
+
+The listening socket is opened once in the parent and shared by every
+worker process, so the kernel spreads connections across them. Each worker
+serves requests from a fixed pool of threads and owns a database pool of
+the same size, created after the fork. Connections are kept alive
+(HTTP/1.1) for up to --keep-alive seconds between requests, but an idle
+one gives up its thread as soon as a new connection would have to wait.
+"""
+import argparse
+import io
+import os
+import signal
+import socket
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import ServerHandler, WSGIServer, WSGIRequestHandler
+
+from sqlalchemy import create_engine
+
+import soap_service
+from soap_service import SessionLocal
+
+WORKERS = int(os.getenv("SOAP_WORKERS", "1"))
+THREADS = int(os.getenv("SOAP_THREADS", "8"))
+# An idle kept-alive connection holds a request thread until it sends again,
+# times out, or a new connection needs the thread (see ThreadPoolWSGIServer)
+KEEP_ALIVE_SECONDS = float(os.getenv("SOAP_KEEP_ALIVE", "5"))
+# Socket timeout while reading a request's body and writing its response
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("SOAP_REQUEST_TIMEOUT", "60"))
+# Bind addresses meaning every interface
+WILDCARD_HOSTS = ("", "0.0.0.0", "::")
+
+class ThreadPoolWSGIServer(WSGIServer):
+    """WSGIServer handling each connection on a bounded pool of threads
+
+    A kept-alive connection waiting for its next request still holds its
+    thread. So that idle clients can't starve new ones, a connection that
+    would have to queue for a thread closes the longest-idle one instead.
+    """
+
+    request_queue_size = 1024
+    allow_reuse_address = True
+
+    def __init__(self, address, handler_class=WSGIRequestHandler, threads=THREADS):
+        super().__init__(address, handler_class)
+        self.threads = threads
+        self.executor = None
+        self._lock = threading.Lock()
+        self._connections = 0          # handed to the pool and not yet finished
+        self._idle = OrderedDict()     # handler -> None, longest idle first
+
+    def serve_forever(self, poll_interval=0.5):
+        # Started here rather than in __init__ so that workers forked
+        # after binding get their own threads
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="soap")
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def process_request(self, request, client_address):
+        with self._lock:
+            self._connections += 1
+            queued = self._connections > self.threads
+            evicted = self._idle.popitem(last=False)[0] if queued and self._idle else None
+        self.executor.submit(self._handle, request, client_address)
+        if evicted is not None:
+            evicted.stop_waiting()
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._lock:
+                self._connections -= 1
+            self.shutdown_request(request)
+
+    def start_idle(self, handler):
+        """Register a handler waiting for its next request; False if it should close instead"""
+        with self._lock:
+            if self._connections > self.threads:
+                return False
+            self._idle[handler] = None
+            return True
+
+    def end_idle(self, handler):
+        """False if the handler was evicted while it waited"""
+        with self._lock:
+            return self._idle.pop(handler, False) is None
+
+class KeepAliveServerHandler(ServerHandler):
+    http_version = "1.1"
+    multithread = True
+
+    def cleanup_headers(self):
+        super().cleanup_headers()
+        if "Content-Length" not in self.headers:
+            # wsgiref has no chunked encoding: a body of unknown length
+            # (a streamed listing) ends when the connection does
+            self.request_handler.close_connection = True
+        if self.request_handler.close_connection:
+            self.headers["Connection"] = "close"
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    """WSGIRequestHandler serving several requests per connection"""
+
+    protocol_version = "HTTP/1.1"
+    timeout = KEEP_ALIVE_SECONDS
+    # Headers and body go out in separate writes; with Nagle on, the body
+    # waits for the client's delayed ACK of the headers (~40 ms)
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            if not self.server.start_idle(self):
+                # Connections are queued for this thread: let one have it
+                return
+            self.handle_one_request(idle=True)
+
+    def stop_waiting(self):
+        """Wake this handler from waiting for a request, so it closes"""
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def handle_one_request(self, idle=False):
+        # self.timeout (keep-alive) applies while waiting for the request line
+        self.connection.settimeout(self.timeout)
+        try:
+            self.raw_requestline = self.rfile.readline(65537)
+        except (TimeoutError, OSError):
+            self.raw_requestline = b""
+        if idle and not self.server.end_idle(self):
+            # Evicted: whatever arrived meanwhile goes unanswered, as on a timeout
+            self.raw_requestline = b""
+        if not self.raw_requestline:
+            self.close_connection = True
+            return
+        self.connection.settimeout(REQUEST_TIMEOUT_SECONDS)
+        if len(self.raw_requestline) > 65536:
+            self.requestline = self.request_version = self.command = ''
+            self.send_error(414)
+            return
+        # Sets close_connection from the HTTP version and Connection header
+        if not self.parse_request():
+            return
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            self.send_error(411)
+            return
+
+        # Read exactly this request's body, so the next request starts clean
+        body = io.BytesIO(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+        handler = KeepAliveServerHandler(body, self.wfile, self.get_stderr(), self.get_environ())
+        handler.request_handler = self
+        handler.run(self.server.get_app())
+        self.wfile.flush()
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """No access log line per request"""
+
+    def log_message(self, format, *args):
+        pass
+
+class QuietKeepAliveRequestHandler(KeepAliveRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def bind_engine(url, pool_size):
+    """Give the service a connection pool with one connection per request thread"""
+    engine = create_engine(url, pool_size=pool_size, max_overflow=0, pool_pre_ping=True)
+    soap_service.engine = engine
+    SessionLocal.configure(bind=engine)
+    return engine
+
+def make_server(host, port, app=None, threads=THREADS, access_log=False, keep_alive=KEEP_ALIVE_SECONDS):
+    if keep_alive > 0:
+        handler = KeepAliveRequestHandler if access_log else QuietKeepAliveRequestHandler
+        handler = type(handler.__name__, (handler,), {"timeout": keep_alive})
+    else:
+        handler = WSGIRequestHandler if access_log else QuietRequestHandler
+    server = ThreadPoolWSGIServer((host, port), handler, threads)
+    server.set_app(app or soap_service.wsgi_application)
+    return server
+
+def run_worker(server, engine):
+    # Connections inherited from the parent belong to the parent: drop them
+    # without closing them, so this worker opens its own
+    engine.dispose(close=False)
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        os._exit(0)
+
+def server_url(host, port):
+    """The URL clients most likely use for a server bound to host: its own
+    name when bound to every interface"""
+    if host in WILDCARD_HOSTS:
+        host = socket.getfqdn()
+    elif ":" in host:
+        host = f"[{host}]"
+    return f"http://{host}:{port}/"
+
+def serve(host="localhost", port=8000, workers=WORKERS, threads=THREADS,
+          database_url=None, access_log=False, keep_alive=KEEP_ALIVE_SECONDS):
+    engine = bind_engine(database_url or soap_service.DATABASE_URL, threads)
+    soap_service.create_tables()
+    server = make_server(host, port, threads=threads, access_log=access_log, keep_alive=keep_alive)
+    # Built before forking, so no worker pays for it on its first ?wsdl.
+    # Only cached: a request on another URL (through a proxy, say) still
+    # gets a WSDL pointing at that URL. Set SOAP_PUBLIC_URL to pin it
+    soap_service.spyne_application.warm_up(server_url(host, server.server_port), pin=False)
+    print(f"Serving SOAP on http://{host}:{server.server_port} "
+          f"({workers} workers x {threads} threads)", flush=True)
+
+    if workers <= 1:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            run_worker(server, engine)
+        children.append(pid)
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    except KeyboardInterrupt:
+        stop(None, None)
+        for pid in children:
+            os.waitpid(pid, 0)
+    finally:
+        server.server_close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="worker processes")
+    parser.add_argument("--threads", type=int, default=THREADS, help="request threads per worker")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--access-log", action="store_true")
+    parser.add_argument("--keep-alive", type=float, default=KEEP_ALIVE_SECONDS,
+                        help="idle seconds before closing a connection (0: one request per connection)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.threads, args.database_url, args.access_log, args.keep_alive)
+
+if __name__ == "__main__":
+    main()
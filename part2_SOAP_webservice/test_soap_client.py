@@ -0,0 +1,164 @@
+# test_soap_client.py
+import csv
+import json
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+
+import soap_client
+import soap_server
+import soap_service
+from soap_service import Base, SessionLocal
+
+@pytest.fixture
+def server_options(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'inventory.db'}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal.configure(bind=engine)
+    soap_service.response_cache.clear()
+    server = soap_server.make_server("localhost", 0, threads=4)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield ["--wsdl", f"http://localhost:{server.server_port}/?wsdl", "--wsdl-cache", ""]
+    server.shutdown()
+    server.server_close()
+    SessionLocal.configure(bind=soap_service.engine)
+
+def read_ndjson(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_batch_subcommands(tmp_path, server_options, capsys):
+    products = tmp_path / "products.csv"
+    with open(products, "w", newline="") as stream:
+        writer = csv.writer(stream)
+        writer.writerow(["name", "quantity", "price"])
+        writer.writerows([f"Product {i}", i, 1.5] for i in range(25))
+        writer.writerow(["Broken", -1, 1.5])
+    options = ["--batch-size", "4", "--concurrency", "3"]
+
+    assert soap_client.main([*server_options, "import", str(products), *options]) == 1
+    assert 'Failed {"name": "Broken", "quantity": -1, "price": 1.5}: Error: Quantity cannot be negative' \
+        in capsys.readouterr().err
+
+    exported = tmp_path / "export.ndjson"
+    assert soap_client.main([*server_options, "export", str(exported), "--batch-size", "10"]) == 0
+    rows = read_ndjson(exported)
+    assert [row["id"] for row in rows] == list(range(1, 26))
+    # Batches run concurrently, so ids needn't follow the input order
+    ids_by_name = {row["name"]: row["id"] for row in rows}
+    assert sorted(ids_by_name) == sorted(f"Product {i}" for i in range(25))
+
+    # Rows with an id update that product, partial rows only the given fields
+    first, second = ids_by_name["Product 0"], ids_by_name["Product 1"]
+    updates = tmp_path / "updates.ndjson"
+    updates.write_text(json.dumps({"id": first, "name": "First", "quantity": 100, "price": 9.5}) + "\n"
+                       + json.dumps({"id": second, "price": 7.0}) + "\n")
+    assert soap_client.main([*server_options, "import", str(updates), *options]) == 0
+    assert soap_client.main([*server_options, "export", str(exported)]) == 0
+    rows = {row["id"]: row for row in read_ndjson(exported)}
+    assert rows[first] == {"id": first, "name": "First", "quantity": 100, "price": 9.5}
+    assert rows[second] == {"id": second, "name": "Product 1", "quantity": 1, "price": 7.0}
+
+    ids = tmp_path / "ids.ndjson"
+    ids.write_text("\n".join(str(i) for i in (5, 99, 3)) + "\n")
+    found = tmp_path / "found.ndjson"
+    assert soap_client.main([*server_options, "get-many", str(ids), "--output", str(found), *options]) == 1
+    assert [row["id"] for row in read_ndjson(found)] == [5, 3]
+    assert "Failed 99: Error: Product not found" in capsys.readouterr().err
+
+    assert soap_client.main([*server_options, "delete-many", str(ids), *options]) == 1
+    assert soap_client.main([*server_options, "export", str(exported)]) == 0
+    assert len(read_ndjson(exported)) == 23
+
+def test_per_item_fallback_and_bad_rows(tmp_path, server_options, monkeypatch, capsys):
+    # A server without the batch operations gets one call per item
+    monkeypatch.setattr(soap_client.BatchClient, "has_operation", lambda self, name: False)
+    products = tmp_path / "products.ndjson"
+    products.write_text("\n".join([
+        json.dumps({"name": "Laptop", "quantity": 5, "price": 999.99}),
+        "not json",
+        json.dumps({"name": "Mouse", "quantity": "many", "price": 29.99}),
+        json.dumps({"name": "Keyboard", "quantity": 15, "price": 79.99}),
+    ]) + "\n")
+    assert soap_client.main([*server_options, "import", str(products)]) == 1
+    errors = capsys.readouterr().err
+    assert 'Failed "not json": Error: line 2: Expecting value' in errors
+    assert "Error: line 3: invalid literal for int()" in errors
+
+    ids = tmp_path / "ids.ndjson"
+    ids.write_text("1\n99\n{}\n2\n")
+    found = tmp_path / "found.ndjson"
+    assert soap_client.main([*server_options, "get-many", str(ids), "--output", str(found)]) == 1
+    assert [row["name"] for row in read_ndjson(found)] == ["Laptop", "Keyboard"]
+    errors = capsys.readouterr().err
+    assert "Failed 99: Error: Product not found" in errors
+    assert "Failed {}: Error: Record has no id" in errors
+
+    assert soap_client.main([*server_options, "delete-many", str(ids)]) == 1
+    exported = tmp_path / "export.ndjson"
+    assert soap_client.main([*server_options, "export", str(exported)]) == 0
+    assert read_ndjson(exported) == []
+
+def test_cached_wsdl_is_used_while_fresh_then_revalidated(tmp_path, server_options, monkeypatch):
+    url = server_options[1]
+    cache = soap_client.SqliteCache(path=str(tmp_path / "wsdl.db"))
+    transport = soap_client.CompressingTransport(cache=cache)
+    statuses = []
+    get = transport.session.get
+
+    def counting_get(*args, **kwargs):
+        response = get(*args, **kwargs)
+        statuses.append(response.status_code)
+        return response
+
+    def expire():
+        cache.add(f"expires:{url}", b"0")
+
+    monkeypatch.setattr(transport.session, "get", counting_get)
+    wsdl = transport.load(url)
+    # Fresh for the server's max-age: no request at all
+    assert transport.load(url) == wsdl
+    assert statuses == [200]
+    expire()
+    assert transport.load(url) == wsdl
+    assert transport.load(url) == wsdl
+    assert statuses == [200, 304]
+
+    # Once stale, a changed WSDL replaces the cached copy
+    application = soap_service.spyne_application
+    monkeypatch.setattr(application, "wsdl_variants", application.wsdl_encodings(b"<changed/>"))
+    assert transport.load(url) == wsdl
+    expire()
+    assert transport.load(url) == b"<changed/>"
+    assert statuses == [200, 304, 200]
+
+    # Unreachable: the cached copy is better than nothing
+    def unreachable(*args, **kwargs):
+        raise soap_client.ConnectionError("connection refused")
+
+    monkeypatch.setattr(transport.session, "get", unreachable)
+    expire()
+    assert transport.load(url) == b"<changed/>"
+
+def test_retries_only_what_is_safe_to_resend():
+    calls = []
+
+    def flaky(fail_with):
+        def operation():
+            calls.append(fail_with)
+            if len(calls) < 3:
+                raise fail_with
+            return "ok"
+        return operation
+
+    dropped = soap_client.ConnectionError("connection reset")
+    assert soap_client.call_with_retry(flaky(dropped), backoff=0) == "ok"
+    assert len(calls) == 3
+
+    calls.clear()
+    with pytest.raises(soap_client.ConnectionError):
+        soap_client.call_with_retry(flaky(dropped), backoff=0, idempotent=False)
+    assert len(calls) == 1
+
+    calls.clear()
+    assert soap_client.call_with_retry(flaky(soap_client.ConnectTimeout()), backoff=0, idempotent=False) == "ok"
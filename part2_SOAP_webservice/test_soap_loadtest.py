@@ -0,0 +1,23 @@
+# test_soap_loadtest.py
+from soap_loadtest import percentile, summarize
+
+def test_percentile_is_nearest_rank():
+    hundred = list(range(1, 101))
+    assert percentile(hundred, 0.50) == 50
+    assert percentile(hundred, 0.95) == 95
+    assert percentile(hundred, 0.99) == 99
+    assert percentile(hundred, 1.0) == 100
+    assert percentile(list(range(1, 11)), 0.50) == 5
+    assert percentile([7], 0.99) == 7
+    assert percentile([1, 2], 0.0) == 1
+    assert percentile([], 0.5) is None
+
+def test_summarize():
+    latencies = [i / 1000 for i in range(100, 0, -1)]  # 1..100 ms, unsorted
+    assert summarize(latencies, errors=2, duration=4) == {
+        "requests": 100,
+        "errors": 2,
+        "throughput": 25.0,
+        "latency_ms": {"p50": 50.0, "p95": 95.0, "p99": 99.0, "max": 100.0},
+    }
+    assert summarize([], errors=0, duration=1)["latency_ms"] == {"p50": None, "p95": None, "p99": None, "max": None}
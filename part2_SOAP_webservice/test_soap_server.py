@@ -0,0 +1,133 @@
+# test_soap_server.py
+import gzip
+import http.client
+import threading
+import time
+import urllib.request
+
+from sqlalchemy import create_engine
+
+import soap_server
+import soap_service
+
+def test_slow_request_does_not_block_others():
+    release = threading.Event()
+
+    def app(environ, start_response):
+        if environ["PATH_INFO"] == "/slow":
+            release.wait(timeout=10)
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        return [environ["PATH_INFO"].encode()]
+
+    server = soap_server.make_server("localhost", 0, app, threads=2)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://localhost:{server.server_port}"
+    try:
+        slow = threading.Thread(target=urllib.request.urlopen, args=(f"{base}/slow",))
+        slow.start()
+        # Answered while /slow is still holding the other thread
+        assert urllib.request.urlopen(f"{base}/fast", timeout=5).read() == b"/fast"
+        assert slow.is_alive()
+        release.set()
+        slow.join(timeout=5)
+    finally:
+        release.set()
+        server.shutdown()
+        server.server_close()
+
+def test_connections_are_kept_alive_until_a_body_without_length():
+    def app(environ, start_response):
+        body = environ["wsgi.input"].read(int(environ.get("CONTENT_LENGTH") or 0))
+        if environ["PATH_INFO"] == "/stream":
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return iter([b"a", b"b"])
+        start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", str(len(body)))])
+        return [body]
+
+    server = soap_server.make_server("localhost", 0, app, threads=2, keep_alive=5)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("localhost", server.server_port, timeout=5)
+    try:
+        conn.request("POST", "/echo", b"first")
+        assert conn.getresponse().read() == b"first"
+        sock = conn.sock
+        conn.request("POST", "/echo", b"second")
+        response = conn.getresponse()
+        assert response.read() == b"second"
+        assert conn.sock is sock and response.getheader("Connection") is None
+
+        conn.request("GET", "/stream")
+        response = conn.getresponse()
+        assert response.getheader("Connection") == "close"
+        assert response.read() == b"ab"
+    finally:
+        conn.close()
+        server.shutdown()
+        server.server_close()
+
+def test_idle_connections_give_their_threads_to_new_ones():
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain"), ("Content-Length", "2")])
+        return [b"ok"]
+
+    server = soap_server.make_server("localhost", 0, app, threads=2, keep_alive=30)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    idle = [http.client.HTTPConnection("localhost", server.server_port, timeout=5) for _ in range(2)]
+    try:
+        for conn in idle:
+            conn.request("GET", "/")
+            assert conn.getresponse().read() == b"ok"
+        # Both threads now wait on idle connections for up to 30 s
+        start = time.monotonic()
+        assert urllib.request.urlopen(f"http://localhost:{server.server_port}/", timeout=5).read() == b"ok"
+        assert time.monotonic() - start < 2
+        # The longest-idle connection was the one closed
+        assert idle[0].sock.recv(1) == b""
+        idle[1].request("GET", "/")
+        assert idle[1].getresponse().read() == b"ok"
+    finally:
+        for conn in idle:
+            conn.close()
+        server.shutdown()
+        server.server_close()
+
+def test_compressed_cache_miss_keeps_the_connection(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'inventory.db'}")
+    soap_service.Base.metadata.create_all(bind=engine)
+    soap_service.SessionLocal.configure(bind=engine)
+    soap_service.response_cache.clear()
+    ids = "".join(f"<tns:integer>{i}</tns:integer>" for i in range(200))
+    body = (
+        '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" xmlns:tns="inventory.soap">'
+        f"<soapenv:Body><tns:GetProductsByIds><tns:product_ids>{ids}</tns:product_ids></tns:GetProductsByIds>"
+        "</soapenv:Body></soapenv:Envelope>"
+    ).encode()
+    headers = {"Content-Type": "text/xml; charset=utf-8", "Accept-Encoding": "gzip"}
+
+    server = soap_server.make_server("localhost", 0, threads=2, keep_alive=5)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("localhost", server.server_port, timeout=5)
+    try:
+        bodies, sockets = [], []
+        for _ in range(2):  # miss, then hit
+            conn.request("POST", "/", body, headers)
+            sockets.append(conn.sock)
+            response = conn.getresponse()
+            bodies.append(response.read())
+            assert response.getheader("Content-Encoding") == "gzip"
+            assert int(response.getheader("Content-Length")) == len(bodies[-1])
+            assert response.getheader("Connection") is None
+        assert sockets[0] is sockets[1]
+        assert gzip.decompress(bodies[0]) == gzip.decompress(bodies[1])
+    finally:
+        conn.close()
+        server.shutdown()
+        server.server_close()
+        soap_service.SessionLocal.configure(bind=soap_service.engine)
+
+def test_server_url_names_the_bound_host(monkeypatch):
+    monkeypatch.setattr(soap_server.socket, "getfqdn", lambda: "inventory-1.example.com")
+    assert soap_server.server_url("0.0.0.0", 8000) == "http://inventory-1.example.com:8000/"
+    assert soap_server.server_url("", 8000) == "http://inventory-1.example.com:8000/"
+    assert soap_server.server_url("10.0.0.5", 8000) == "http://10.0.0.5:8000/"
+    assert soap_server.server_url("::1", 8000) == "http://[::1]:8000/"
@@ -0,0 +1,377 @@
+# test_soap_service.py
+import gzip
+import io
+import json
+import tracemalloc
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+from lxml import etree
+from sqlalchemy import create_engine, event
+
+import soap_service
+from soap_service import Base, SessionLocal
+
+TNS = "inventory.soap"
+
+def to_xml(name, value):
+    """Serialize an argument; lists hold (element name, value) pairs"""
+    if isinstance(value, list):
+        value = "".join(to_xml(child, child_value) for child, child_value in value)
+    return f"<tns:{name}>{value}</tns:{name}>"
+
+def envelope(operation, **args):
+    body = "".join(to_xml(name, value) for name, value in args.items())
+    return (
+        '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+        f'xmlns:tns="{TNS}"><soapenv:Body><tns:{operation}>{body}</tns:{operation}>'
+        "</soapenv:Body></soapenv:Envelope>"
+    ).encode()
+
+def wsgi_environ(body=b"", method="POST", headers=None, query=""):
+    environ = {
+        "REQUEST_METHOD": method,
+        "QUERY_STRING": query,
+        "CONTENT_TYPE": "text/xml; charset=utf-8",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+    }
+    environ.update({f"HTTP_{name.upper().replace('-', '_')}": value for name, value in (headers or {}).items()})
+    setup_testing_defaults(environ)
+    return environ
+
+def wsgi_request(app, body=b"", method="POST", headers=None, query=""):
+    environ = wsgi_environ(body, method, headers, query)
+    response = {}
+
+    def start_response(status, response_headers, exc_info=None):
+        response["status"] = status
+        response["headers"] = dict(response_headers)
+
+    response["body"] = b"".join(app(environ, start_response))
+    return response
+
+def call(operation, **args):
+    """Call an operation through the WSGI app and return its result element"""
+    response = wsgi_request(soap_service.wsgi_application, envelope(operation, **args))
+    return etree.fromstring(response["body"]).find(f".//{{{TNS}}}{operation}Result")
+
+def product_dict(element):
+    return {etree.QName(child).localname: child.text for child in element}
+
+@pytest.fixture(autouse=True)
+def database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'inventory.db'}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal.configure(bind=engine)
+    soap_service.response_cache.clear()
+    yield engine
+    SessionLocal.configure(bind=soap_service.engine)
+
+def test_legacy_and_typed_products():
+    call("CreateProduct", name="Laptop", quantity=5, price=999.99)
+    call("CreateProduct", name="Mouse", quantity=20, price=29.99)
+
+    assert [s.text for s in call("GetAllProducts")] == [
+        "ID: 1, Name: Laptop, Quantity: 5, Price: $999.99",
+        "ID: 2, Name: Mouse, Quantity: 20, Price: $29.99",
+    ]
+    assert [product_dict(p) for p in call("GetAllProductsTyped")] == [
+        {"id": "1", "name": "Laptop", "quantity": "5", "price": "999.99"},
+        {"id": "2", "name": "Mouse", "quantity": "20", "price": "29.99"},
+    ]
+    assert product_dict(call("GetProductTyped", product_id=2))["name"] == "Mouse"
+    assert call("GetProductTyped", product_id=99) is None
+
+def test_products_page(monkeypatch):
+    monkeypatch.setattr(soap_service, "MAX_PAGE_SIZE", 4)
+    for i in range(10):
+        call("CreateProduct", name=f"Item {i}", quantity=i, price=1.5)
+
+    seen, after_id = [], None
+    while True:
+        page = call("GetProductsPage", **({"after_id": after_id} if after_id else {}), limit=50)
+        products = page.find(f"{{{TNS}}}products")
+        assert len(products) <= 4
+        seen += [product_dict(p)["id"] for p in products]
+        after_id = page.findtext(f"{{{TNS}}}next_after_id")
+        if after_id is None:
+            break
+    assert seen == [str(i) for i in range(1, 11)]
+
+@pytest.mark.parametrize("validation, accepted", [("lxml", False), ("soft", False), ("none", True)])
+def test_validation_modes(validation, accepted):
+    app = soap_service.InventoryWsgiApplication(soap_service.make_application(validation))
+    too_long = envelope("CreateProducts", products=[("ProductIn", [("name", "x" * 101), ("quantity", 1), ("price", 1.0)])])
+    response = wsgi_request(app, too_long)
+    assert response["status"].startswith("200" if accepted else "500")
+    # Business rules still apply to trusted clients
+    negative = etree.fromstring(wsgi_request(app, envelope("CreateProduct", name="Mouse", quantity=-1, price=1.0))["body"])
+    assert negative.findtext(f".//{{{TNS}}}CreateProductResult") == "Error: Quantity cannot be negative"
+
+def test_single_statement_writes(database):
+    call("CreateProduct", name="Laptop", quantity=5, price=999.99)
+    statements = []
+    event.listen(database, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    assert call("UpdateProduct", product_id=1, quantity=3).text == "Product 1 updated successfully"
+    assert product_dict(call("GetProductTyped", product_id=1)) == {"id": "1", "name": "Laptop", "quantity": "3", "price": "999.99"}
+    assert call("UpdateProduct", product_id=42, price=1.0).text == "Error: Product not found"
+    assert call("UpdateProduct", product_id=1).text == "Error: Nothing to update"
+    assert call("DeleteProduct", product_id=1).text == "Product 1 deleted successfully"
+    assert call("DeleteProduct", product_id=1).text == "Error: Product not found"
+
+    writes = [s for s in statements if not s.startswith("SELECT")]
+    assert len(writes) == len(statements) - 1 == 4
+
+def streamed_peak_memory(database, products):
+    with database.begin() as conn:
+        conn.execute(soap_service.Product.__table__.delete())
+        conn.execute(soap_service.Product.__table__.insert(), [
+            {"name": f"Product {i}", "quantity": i, "price": 9.99} for i in range(products)
+        ])
+    body = envelope("GetAllProductsTyped")
+    tracemalloc.start()
+    try:
+        chunks = soap_service.spyne_application(
+            wsgi_environ(body), lambda status, headers, exc_info=None: None
+        )
+        received = sum(chunk.count(b"<tns:ProductType>") for chunk in chunks)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert received == products
+    return peak
+
+def test_get_all_products_streams_in_bounded_memory(database):
+    small = streamed_peak_memory(database, 2000)
+    large = streamed_peak_memory(database, 16000)
+    # Eight times the rows, (nearly) the same peak
+    assert large < small * 1.5
+
+def statuses(result):
+    return [(s.findtext(f"{{{TNS}}}id"), s.findtext(f"{{{TNS}}}success"), s.findtext(f"{{{TNS}}}message")) for s in result]
+
+def test_batch_operations():
+    created = call("CreateProducts", products=[
+        ("ProductIn", [("name", "Laptop"), ("quantity", 5), ("price", 999.99)]),
+        ("ProductIn", [("name", "Broken"), ("quantity", -1), ("price", 1.0)]),
+        ("ProductIn", [("name", "Mouse"), ("quantity", 20), ("price", 29.99)]),
+    ])
+    assert statuses(created) == [
+        ("1", "true", "Product created"),
+        (None, "false", "Error: Quantity cannot be negative"),
+        ("2", "true", "Product created"),
+    ]
+
+    updated = call("UpdateProducts", products=[
+        ("ProductType", [("id", 2), ("name", "Mouse"), ("quantity", 15), ("price", 24.99)]),
+        ("ProductType", [("id", 42), ("name", "Ghost"), ("quantity", 1), ("price", 1.0)]),
+    ])
+    assert statuses(updated) == [("2", "true", "Product updated"), ("42", "false", "Error: Product not found")]
+    assert product_dict(call("GetProductTyped", product_id=2))["quantity"] == "15"
+
+    deleted = call("DeleteProducts", product_ids=[("integer", 1), ("integer", 42)])
+    assert statuses(deleted) == [("1", "true", "Product deleted"), ("42", "false", "Error: Product not found")]
+    assert [product_dict(p)["id"] for p in call("GetAllProductsTyped")] == ["2"]
+
+def test_get_products_by_ids():
+    for name in ("Laptop", "Mouse", "Cable"):
+        call("CreateProduct", name=name, quantity=1, price=2.0)
+
+    lookups = call("GetProductsByIds", product_ids=[("integer", i) for i in (3, 42, 1, 3)])
+    assert [
+        (l.findtext(f"{{{TNS}}}id"), l.findtext(f"{{{TNS}}}found"), l.findtext(f"{{{TNS}}}product/{{{TNS}}}name"))
+        for l in lookups
+    ] == [("3", "true", "Cable"), ("42", "false", None), ("1", "true", "Laptop"), ("3", "true", "Cable")]
+
+def test_metrics(monkeypatch):
+    monkeypatch.setattr(soap_service, "metrics", soap_service.Metrics())
+    call("CreateProduct", name="Laptop", quantity=5, price=999.99)
+    body = envelope("GetAllProductsTyped")
+    listing = wsgi_request(soap_service.wsgi_application, body)
+
+    response = wsgi_request(soap_service.wsgi_application, method="GET", query="metrics")
+    assert response["status"] == "200 OK"
+    lines = response["body"].decode().splitlines()
+    for phase in ("parse", "deserialize", "execute", "serialize", "send", "total"):
+        assert f'soap_phase_seconds_count{{operation="GetAllProductsTyped",phase="{phase}"}} 1' in lines
+    assert f'soap_payload_bytes_sum{{operation="GetAllProductsTyped",direction="request"}} {len(body)}' in lines
+    assert f'soap_payload_bytes_sum{{operation="GetAllProductsTyped",direction="response"}} {len(listing["body"])}' in lines
+
+def test_read_responses_are_cached_until_a_write(monkeypatch):
+    call("CreateProduct", name="Laptop", quantity=5, price=999.99)
+    first = wsgi_request(soap_service.wsgi_application, envelope("GetProductTyped", product_id=1))
+    assert first["status"] == "200 OK"
+
+    # Same request with another prefix and extra whitespace: a hit that never reaches the database
+    reformatted = (
+        '<e:Envelope xmlns:e="http://schemas.xmlsoap.org/soap/envelope/" xmlns:p="inventory.soap">\n'
+        "  <e:Body><p:GetProductTyped><p:product_id> 1 </p:product_id></p:GetProductTyped></e:Body>\n"
+        "</e:Envelope>"
+    ).encode()
+    monkeypatch.setattr(soap_service, "SessionLocal", None)
+    assert wsgi_request(soap_service.wsgi_application, reformatted)["body"] == first["body"]
+    assert wsgi_request(soap_service.wsgi_application, envelope("GetProductTyped", product_id=1))["body"] == first["body"]
+    monkeypatch.undo()
+
+    # The same names in another namespace are a different request, which spyne rejects
+    for operation_ns, argument_ns in (("wrong.ns", "wrong.ns"), ("inventory.soap", "wrong.ns")):
+        wrong = reformatted.replace(b'xmlns:p="inventory.soap"', f'xmlns:p="{operation_ns}" xmlns:q="{argument_ns}"'.encode())
+        wrong = wrong.replace(b"p:product_id", b"q:product_id")
+        assert wsgi_request(soap_service.wsgi_application, wrong)["status"].startswith("500")
+
+    call("UpdateProduct", product_id=1, quantity=3)
+    assert product_dict(call("GetProductTyped", product_id=1))["quantity"] == "3"
+
+def test_cache_entries_expire_and_stay_within_bounds():
+    cache = soap_service.ResponseCache(max_bytes=10, ttl=60, max_entry_bytes=6)
+    generation = cache.generation
+    cache.put("a", b"aaaa", [], generation)
+    cache.put("too big", b"x" * 7, [], generation)
+    cache.put("b", b"bbbb", [], generation)
+    cache.put("c", b"cccc", [], generation)
+    assert [key for key in ("a", "too big", "b", "c") if cache.get(key)] == ["b", "c"]
+
+    cache.clear()
+    cache.put("stale", b"s", [], generation)
+    assert cache.get("stale") is None
+
+    # An alias holds no body of its own and dies with its target
+    cache.put("e", b"eeee", [], cache.generation)
+    cache.alias("alias of e", "e", cache.generation, size=1)
+    assert cache.get("alias of e")[0] == b"eeee" and cache._size == 5
+    cache.put("f", b"ffff", [], cache.generation)
+    cache.put("g", b"gggg", [], cache.generation)
+    assert cache.get("e") is None and cache.get("alias of e") is None
+    assert cache._size == 8
+
+    cache.ttl = -1
+    cache.put("d", b"d", [], cache.generation)
+    assert cache.get("d") is None
+    # Found expired, so dropped rather than left for size pressure
+    assert "d" not in cache._entries and cache._size == 8
+
+def test_json_and_msgpack_endpoints():
+    def get(path, query="", method="GET", status="200 OK"):
+        environ = wsgi_environ(method=method, query=query)
+        environ["PATH_INFO"] = path
+        response = {}
+        body = b"".join(soap_service.wsgi_application(environ, lambda status, headers, exc_info=None: response.update(status=status)))
+        assert response["status"] == status
+        return body
+
+    call("CreateProduct", name="Laptop", quantity=5, price=999.99)
+    assert json.loads(get("/json/GetProductTyped", "product_id=1")) == {"id": 1, "name": "Laptop", "quantity": 5, "price": 999.99}
+    call("CreateProduct", name="Mouse", quantity=20, price=29.99)
+    assert [p["name"] for p in json.loads(get("/json/GetAllProductsTyped"))] == ["Laptop", "Mouse"]
+    assert json.loads(get("/json/GetAllProducts"))[1] == "ID: 2, Name: Mouse, Quantity: 20, Price: $29.99"
+
+    # A write over JSON invalidates what SOAP has cached
+    assert product_dict(call("GetProductTyped", product_id=1))["quantity"] == "5"
+    # Writes are POST only
+    get("/json/UpdateProduct", "product_id=1&quantity=2", status="405 Method Not Allowed")
+    assert product_dict(call("GetProductTyped", product_id=1))["quantity"] == "5"
+    assert json.loads(get("/json/UpdateProduct", "product_id=1&quantity=2", method="POST")) == "Product 1 updated successfully"
+    assert product_dict(call("GetProductTyped", product_id=1))["quantity"] == "2"
+
+    msgpack = pytest.importorskip("msgpack")
+    lookups = msgpack.unpackb(get("/msgpack/GetProductsByIds", "product_ids=1&product_ids=7"), raw=False)
+    assert [(lookup["id"], lookup["found"]) for lookup in lookups] == [(1, True), (7, False)]
+    assert msgpack.unpackb(get("/msgpack/GetAllProductsTyped"))[0]["quantity"] == 2
+
+def test_msgpack_listing_is_streamed(monkeypatch):
+    msgpack = pytest.importorskip("msgpack")
+    monkeypatch.setattr(soap_service, "MSGPACK_SPOOL_BYTES", 100)
+    monkeypatch.setattr(soap_service, "MSGPACK_CHUNK_BYTES", 64)
+    items = ({"id": i, "name": f"Item {i}"} for i in range(25))
+    chunks = list(soap_service.stream_msgpack_array(items, dict, batch_size=10))
+    assert len(chunks) > 3 and max(len(chunk) for chunk in chunks) <= 64
+    assert msgpack.unpackb(b"".join(chunks)) == [{"id": i, "name": f"Item {i}"} for i in range(25)]
+    assert msgpack.unpackb(b"".join(soap_service.stream_msgpack_array(iter(()), dict))) == []
+
+def test_gzip_both_ways():
+    products = [("ProductIn", [("name", f"Item {i}"), ("quantity", i), ("price", 1.5)]) for i in range(200)]
+    compressed = gzip.compress(envelope("CreateProducts", products=products))
+    created = wsgi_request(soap_service.wsgi_application, compressed, headers={"Content-Encoding": "gzip"})
+    assert created["status"] == "200 OK"
+    assert created["body"].count(b"Product created") == 200
+
+    plain = wsgi_request(soap_service.wsgi_application, envelope("GetAllProductsTyped"))
+    for _ in range(2):  # streamed miss, then cache hit
+        response = wsgi_request(soap_service.wsgi_application, envelope("GetAllProductsTyped"),
+                                headers={"Accept-Encoding": "gzip, deflate"})
+        assert response["headers"]["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response["body"]) == plain["body"]
+        assert len(response["body"]) < len(plain["body"]) / 5
+
+    small = wsgi_request(soap_service.wsgi_application, envelope("GetProduct", product_id=1), headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small["headers"]
+
+    assert wsgi_request(soap_service.wsgi_application, b"x", headers={"Content-Encoding": "br"})["status"].startswith("415")
+    assert wsgi_request(soap_service.wsgi_application, b"not gzip", headers={"Content-Encoding": "gzip"})["status"].startswith("400")
+
+def test_gzip_requests(monkeypatch):
+    monkeypatch.setattr(soap_service, "metrics", soap_service.Metrics())
+    # Concatenated members, as some clients send streamed bodies
+    body = envelope("CreateProduct", name="Laptop", quantity=5, price=999.99)
+    compressed = gzip.compress(body[:100]) + gzip.compress(body[100:])
+    created = wsgi_request(soap_service.wsgi_application, compressed, headers={"Content-Encoding": "gzip"})
+    assert b"created successfully" in created["body"]
+    # Sized as sent, not as inflated
+    sizes = soap_service.metrics.sizes[("CreateProduct", "request")]
+    assert sizes.sum == len(compressed)
+
+    too_big = gzip.compress(b" " * 2000)
+    app = soap_service.GzipMiddleware(soap_service.wsgi_application, max_request_bytes=1000)
+    assert wsgi_request(app, too_big, headers={"Content-Encoding": "gzip"})["status"].startswith("413")
+    truncated = wsgi_request(app, compressed[:-10], headers={"Content-Encoding": "gzip"})
+    assert truncated["status"].startswith("400")
+
+    assert soap_service.accepts_gzip({"HTTP_ACCEPT_ENCODING": "br;q=1.0, GZIP;q=0.5"})
+    assert soap_service.accepts_gzip({"HTTP_ACCEPT_ENCODING": "*"})
+    assert not soap_service.accepts_gzip({"HTTP_ACCEPT_ENCODING": "gzip;q=0, *"})
+    assert not soap_service.accepts_gzip({})
+
+def test_wsdl_is_precomputed_with_strong_etags(tmp_path):
+    frozen = tmp_path / "wsdl.xml"
+    soap_service.spyne_application.freeze_wsdl(str(frozen), "https://inventory.example.com/")
+    app = soap_service.InventoryWsgiApplication(soap_service.application)
+    app.warm_up(path=str(frozen))
+
+    response = wsgi_request(app, method="GET", query="wsdl")
+    assert response["status"] == "200 OK"
+    assert response["body"] == frozen.read_bytes()
+    assert b'location="https://inventory.example.com/"' in response["body"]
+    assert response["headers"]["Cache-Control"].startswith("public, max-age=")
+    etag = response["headers"]["ETag"]
+
+    compressed = wsgi_request(app, method="GET", query="wsdl", headers={"Accept-Encoding": "gzip"})
+    assert gzip.decompress(compressed["body"]) == response["body"]
+    assert compressed["headers"]["ETag"] not in (etag, None)
+
+    unchanged = wsgi_request(app, method="GET", query="wsdl", headers={"If-None-Match": f'"other", {etag}'})
+    assert unchanged["status"] == "304 Not Modified" and unchanged["body"] == b""
+    assert unchanged["headers"]["ETag"] == etag
+    # Through the gzip and cache middlewares too
+    served = wsgi_request(soap_service.wsgi_application, method="GET", query="wsdl", headers={"Accept-Encoding": "gzip"})
+    assert served["headers"]["Content-Encoding"] == "gzip"
+    unchanged = wsgi_request(soap_service.wsgi_application, method="GET", query="wsdl", headers={
+        "Accept-Encoding": "gzip", "If-None-Match": served["headers"]["ETag"],
+    })
+    assert unchanged["status"] == "304 Not Modified" and unchanged["body"] == b""
+
+def test_wsdl_address_follows_the_request_unless_pinned():
+    app = soap_service.InventoryWsgiApplication(soap_service.application)
+    app.warm_up("http://localhost:8000/", pin=False)
+    for host in ("inventory.example.com", "localhost:8000", "inventory.example.com"):
+        body = wsgi_request(app, method="GET", query="wsdl", headers={"Host": host})["body"]
+        assert f'location="http://{host}/"'.encode() in body
+    assert list(app.wsdl_by_url) == ["http://localhost:8000/", "http://inventory.example.com/"]
+
+    app.warm_up("https://inventory.example.com/")
+    body = wsgi_request(app, method="GET", query="wsdl", headers={"Host": "internal:8000"})["body"]
+    assert b'location="https://inventory.example.com/"' in body
+    # Nothing to warm once pinned
+    app.warm_up("http://internal:8000/", pin=False)
+    assert "http://internal:8000/" not in app.wsdl_by_url
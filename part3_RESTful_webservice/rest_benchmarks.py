@@ -0,0 +1,150 @@
+# rest_benchmarks.py
+"""Micro-benchmarks for the REST service, run in-process against SQLite
+
+    python rest_benchmarks.py compression --products 20000
+    python rest_benchmarks.py listing-cache --products 20000
+    python rest_benchmarks.py msgpack --products 100000
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+
+import rest_service
+from rest_service import app, Base, ProductDB, ProductCreate, products_adapter
+
+# Only the msgpack benchmark needs it (an optional extra)
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+def seeded_client(directory, products):
+    engine = create_engine(f"sqlite:///{directory}/bench.db")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(ProductDB), [
+            {"name": f"Product {i}", "quantity": i % 500, "price": round(i * 0.37, 2)}
+            for i in range(products)
+        ])
+    rest_service.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    rest_service.replica_sessions = []
+    return TestClient(app)
+
+def measure(client, path, headers, requests, before_each=None):
+    """Return (bytes on the wire, CPU seconds) per request"""
+    wire_bytes = 0
+    cpu = 0.0
+    for _ in range(requests):
+        if before_each:
+            before_each()
+        start = time.process_time()
+        with client.stream("GET", path, headers=headers) as response:
+            # iter_raw skips client-side decompression, so this is what was sent
+            wire_bytes += sum(len(chunk) for chunk in response.iter_raw())
+        cpu += time.process_time() - start
+    return wire_bytes / requests, cpu / requests
+
+def report(label, wire_bytes, cpu):
+    print(f"{label:<28} {wire_bytes / 1024:>10.1f} KiB {cpu * 1000:>10.2f} ms CPU")
+
+def bench_compression(args):
+    with tempfile.TemporaryDirectory() as directory:
+        client = seeded_client(directory, args.products)
+        print(f"GET /products with {args.products} products, {args.requests} requests each")
+        report("identity", *measure(client, "/products", {"Accept-Encoding": "identity"}, args.requests))
+        for encoding in rest_service.SUPPORTED_ENCODINGS:
+            headers = {"Accept-Encoding": encoding}
+            report(f"{encoding} (compressed per request)",
+                   *measure(client, "/products", headers, args.requests, rest_service.listing_cache.clear))
+            report(f"{encoding} (precompressed cache)",
+                   *measure(client, "/products", headers, args.requests))
+
+def bench_listing_cache(args):
+    with tempfile.TemporaryDirectory() as directory:
+        seeded_client(directory, args.products)
+        request = Request({
+            "type": "http",
+            "method": "GET",
+            "path": "/products",
+            "query_string": b"",
+            "headers": [(b"accept-encoding", args.encoding.encode())],
+        })
+
+        async def handler_time(requests, invalidate):
+            start = time.perf_counter()
+            for _ in range(requests):
+                if invalidate:
+                    rest_service.bump_collection_version()
+                await rest_service.get_all_products(request, after_id=None, limit=None)
+            return (time.perf_counter() - start) / requests
+
+        print(f"get_all_products handler, {args.products} products, Accept-Encoding: {args.encoding}")
+        miss = asyncio.run(handler_time(max(1, args.requests // 100), invalidate=True))
+        hit = asyncio.run(handler_time(args.requests, invalidate=False))
+        print(f"{'miss (query + encode)':<28} {miss * 1e6:>12.1f} us")
+        print(f"{'hit (cached bytes)':<28} {hit * 1e6:>12.1f} us")
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def bench_msgpack(args):
+    if msgpack is None:
+        sys.exit("msgpack is not installed: pip install -e .[msgpack]")
+    rows = [
+        ProductDB(id=i, name=f"Product {i}", quantity=i % 500, price=round(i * 0.37, 2))
+        for i in range(1, args.products + 1)
+    ]
+    # Validating rows into ProductResponse is the same for both formats
+    products = products_adapter.validate_python(rows, from_attributes=True)
+    creates_adapter = rest_service.TypeAdapter(rest_service.List[ProductCreate])
+    formats = {
+        "json": (lambda: products_adapter.dump_json(products), json.loads),
+        "msgpack": (lambda: msgpack.packb(products_adapter.dump_python(products)), msgpack.unpackb),
+    }
+    print(f"{args.products} products, best of {args.repeat}")
+    print(f"{'format':<10} {'size':>12} {'encode':>10} {'decode':>10} {'decode+validate':>16}")
+    for name, (encode, decode) in formats.items():
+        encode_time, body = timed(encode, args.repeat)
+        decode_time, _ = timed(lambda: decode(body), args.repeat)
+        validate_time, _ = timed(lambda: creates_adapter.validate_python(decode(body)), args.repeat)
+        print(f"{name:<10} {len(body) / 1024:>8.0f} KiB {encode_time * 1000:>7.1f} ms "
+              f"{decode_time * 1000:>7.1f} ms {validate_time * 1000:>13.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compression = commands.add_parser("compression", help="bytes on the wire and CPU for GET /products")
+    compression.add_argument("--products", type=int, default=20000)
+    compression.add_argument("--requests", type=int, default=20)
+    compression.set_defaults(run=bench_compression)
+
+    listing_cache = commands.add_parser("listing-cache", help="GET /products handler time on cache hit and miss")
+    listing_cache.add_argument("--products", type=int, default=20000)
+    listing_cache.add_argument("--requests", type=int, default=10000)
+    listing_cache.add_argument("--encoding", default="identity")
+    listing_cache.set_defaults(run=bench_listing_cache)
+
+    msgpack_ = commands.add_parser("msgpack", help="JSON vs MessagePack encode/decode time and size")
+    msgpack_.add_argument("--products", type=int, default=100000)
+    msgpack_.add_argument("--repeat", type=int, default=5)
+    msgpack_.set_defaults(run=bench_msgpack)
+
+    args = parser.parse_args()
+    args.run(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# test_rest_service.py
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import rest_service
+from rest_service import app, Base
+
+def sqlite_sessionmaker(path):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture(autouse=True)
+def empty_listing_cache():
+    rest_service.listing_cache.clear()
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(rest_service, "SessionLocal", sqlite_sessionmaker(tmp_path / "primary.db"))
+    monkeypatch.setattr(rest_service, "replica_sessions", [])
+    return TestClient(app)
+
+def test_crud(client):
+    created = client.post("/products", json={"name": "Laptop", "quantity": 5, "price": 999.99})
+    assert created.status_code == 201
+    product_id = created.json()["id"]
+
+    assert client.put(f"/products/{product_id}", json={"quantity": 3}).json()["quantity"] == 3
+    assert [p["name"] for p in client.get("/products/search/lap").json()] == ["Laptop"]
+    assert client.delete(f"/products/{product_id}").status_code == 200
+    assert client.get(f"/products/{product_id}").status_code == 404
+
+def test_reads_go_to_replica_unless_client_wrote_recently(client, tmp_path, monkeypatch):
+    # Two unsynchronised databases stand in for primary and replica
+    monkeypatch.setattr(rest_service, "replica_sessions", [sqlite_sessionmaker(tmp_path / "replica.db")])
+
+    assert client.post("/products", json={"name": "Mouse", "quantity": 20, "price": 29.99}).status_code == 201
+    assert rest_service.STICKY_COOKIE in client.cookies
+
+    # The writer reads its own write from the primary...
+    assert [p["name"] for p in client.get("/products").json()] == ["Mouse"]
+    assert [p["name"] for p in client.get("/products/search/mouse").json()] == ["Mouse"]
+    # ...while other clients are served by the (lagging) replica
+    assert TestClient(app).get("/products").json() == []
+    assert TestClient(app).get("/products/search/mouse").json() == []
+
+    # Once the window has passed the writer goes back to the replica
+    client.cookies.set(rest_service.STICKY_COOKIE, "0")
+    assert client.get("/products").json() == []
+    assert client.get("/products/search/mouse").json() == []
+
+def test_listing_cache_entries_expire(client, monkeypatch):
+    monkeypatch.setattr(rest_service.listing_cache, "ttl", 0.05)
+    assert client.get("/products").json() == []
+    # A write the cache can't see, as from another worker process
+    with rest_service.SessionLocal() as db:
+        db.add(rest_service.ProductDB(name="Mouse", quantity=20, price=29.99))
+        db.commit()
+    assert client.get("/products").json() == []
+    time.sleep(0.1)
+    assert [p["name"] for p in client.get("/products").json()] == ["Mouse"]
+
+def test_sharded_storage(tmp_path, monkeypatch):
+    router = rest_service.ShardRouter([f"sqlite:///{tmp_path / f'shard{i}.db'}" for i in range(3)])
+    router.create_tables()
+    monkeypatch.setattr(rest_service, "SessionLocal", router.sessionmaker())
+    monkeypatch.setattr(rest_service, "replica_sessions", [])
+    client = TestClient(app)
+
+    ids = [
+        client.post("/products", json={"name": f"Item {i}", "quantity": i, "price": 1.0}).json()["id"]
+        for i in range(30)
+    ]
+    assert len(set(ids)) == 30
+
+    # Every product lives on exactly the shard its id hashes to
+    per_shard = {}
+    for shard_id, shard_engine in router.engines.items():
+        with shard_engine.connect() as conn:
+            per_shard[shard_id] = {row.id for row in conn.execute(rest_service.select(rest_service.ProductDB.id))}
+    assert len([shard for shard in per_shard.values() if shard]) > 1
+    assert all(router.shard_for(i) == shard_id for shard_id, shard in per_shard.items() for i in shard)
+
+    # Keyset pages merged across shards come back in id order, with no gaps
+    seen, after_id = [], None
+    while True:
+        page = client.get("/products", params={"limit": 7} | ({"after_id": after_id} if after_id else {}))
+        seen += [p["id"] for p in page.json()]
+        after_id = page.headers.get("X-Next-Cursor")
+        if after_id is None:
+            break
+    assert seen == sorted(ids)
+    assert [p["id"] for p in client.get("/products/search/item 2").json()] == [ids[2]] + ids[20:]
+
+    assert client.get(f"/products/{ids[5]}").json()["name"] == "Item 5"
+    assert client.delete(f"/products/{ids[5]}").status_code == 200
+    assert len(client.get("/products").json()) == 29
+
+def test_listing_is_served_from_cache_until_a_write(client, monkeypatch):
+    for i in range(50):
+        client.post("/products", json={"name": f"Widget {i}", "quantity": i, "price": 2.5})
+
+    first = client.get("/products", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert len(first.json()) == 50
+
+    # Hits, in either encoding, never reach the database
+    primary = rest_service.SessionLocal
+    monkeypatch.setattr(rest_service, "SessionLocal", None)
+    assert client.get("/products", headers={"Accept-Encoding": "gzip"}).content == first.content
+    assert client.get("/products", headers={"Accept-Encoding": "identity"}).json() == first.json()
+    monkeypatch.setattr(rest_service, "SessionLocal", primary)
+
+    client.delete(f"/products/{first.json()[0]['id']}")
+    assert len(client.get("/products", headers={"Accept-Encoding": "gzip"}).json()) == 49
+
+    page = client.get("/products", params={"limit": 2})
+    assert "Content-Encoding" not in page.headers
+    assert page.headers["X-Next-Cursor"] == str(page.json()[-1]["id"])
+
+def test_msgpack_negotiation(client):
+    msgpack = pytest.importorskip("msgpack")
+    headers = {"Accept": "application/msgpack", "Content-Type": "application/msgpack"}
+
+    created = client.post("/products", content=msgpack.packb({"name": "Cable", "quantity": 7, "price": 4.5}), headers=headers)
+    assert created.status_code == 201
+    assert created.headers["Content-Type"] == "application/msgpack"
+    product = msgpack.unpackb(created.content)
+    assert product == {"name": "Cable", "quantity": 7, "price": 4.5, "id": product["id"]}
+
+    assert msgpack.unpackb(client.get("/products", headers=headers).content) == [product]
+    assert msgpack.unpackb(client.get("/products/search/cab", headers=headers).content) == [product]
+    assert client.get("/products").json() == [product]
+
+    invalid = client.post("/products", content=msgpack.packb({"name": "", "quantity": -1, "price": 1}), headers=headers)
+    assert invalid.status_code == 422
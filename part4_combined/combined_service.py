@@ -0,0 +1,88 @@
+# combined_service.py
+"""SOAP and REST from one ASGI process, sharing one database pool and cache invalidation
+
+    python combined_service.py
+    uvicorn combined_service:create_app --factory --host 0.0.0.0 --port 8000
+
+REST is served at / as before and SOAP under /soap (WSDL at /soap/?wsdl,
+JSON and MessagePack at /soap/json and /soap/msgpack). Both services use
+the same engine, so the process holds one pool of COMBINED_POOL_SIZE
+connections instead of two. A write through either protocol empties both
+response caches, so neither serves a listing the other has changed.
+"""
+import os
+import sys
+
+import uvicorn
+from a2wsgi import WSGIMiddleware
+from sqlalchemy import create_engine
+
+# The services are single-file modules in sibling directories
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for part in ("part2_SOAP_webservice", "part3_RESTful_webservice"):
+    path = os.path.join(ROOT, part)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import rest_service
+import soap_service
+
+POOL_SIZE = int(os.getenv("COMBINED_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("COMBINED_MAX_OVERFLOW", "10"))
+# Threads running SOAP requests; REST's sync routes use anyio's pool
+SOAP_THREADS = int(os.getenv("SOAP_THREADS", "8"))
+
+def share_engine(url=None, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW):
+    """Point both services at one engine and drop the pools they made on import"""
+    engine = create_engine(url or rest_service.DATABASE_URL, pool_size=pool_size,
+                           max_overflow=max_overflow, pool_pre_ping=True)
+    for service in (rest_service, soap_service):
+        service.engine.dispose()
+        service.engine = engine
+        service.SessionLocal.configure(bind=engine)
+    return engine
+
+def _clear_soap_cache():
+    # Without notifying, or the SOAP cache would bump REST's version straight back
+    soap_service.response_cache.clear(notify=False)
+
+def _bump_rest_version():
+    rest_service.bump_collection_version(notify=False)
+
+def _invalidation_listeners():
+    return ((rest_service.on_collection_change, _clear_soap_cache),
+            (soap_service.response_cache.on_clear, _bump_rest_version))
+
+def share_invalidation():
+    """Have a write through either service empty both services' caches
+
+    REST writes bump rest_service.collection_version; SOAP writes clear
+    soap_service.response_cache. Each service calls its own listeners
+    afterwards, and these tell the other service without calling back.
+    """
+    for listeners, listener in _invalidation_listeners():
+        if listener not in listeners:
+            listeners.append(listener)
+
+def unshare_invalidation():
+    """Undo share_invalidation"""
+    for listeners, listener in _invalidation_listeners():
+        if listener in listeners:
+            listeners.remove(listener)
+
+def create_app(database_url=None, pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW, soap_threads=SOAP_THREADS):
+    if rest_service.shard_router:
+        # SOAP reads the products table at DATABASE_URL; shards would split it
+        raise RuntimeError("the combined service does not support DATABASE_SHARD_URLS")
+    share_engine(database_url, pool_size, max_overflow)
+    share_invalidation()
+    rest_service.create_tables()
+
+    app = rest_service.app
+    if not any(getattr(route, "path", None) == "/soap" for route in app.routes):
+        # a2wsgi streams request and response bodies through bounded queues
+        app.mount("/soap", WSGIMiddleware(soap_service.wsgi_application, workers=soap_threads))
+    return app
+
+if __name__ == "__main__":
+    uvicorn.run(create_app(), host="localhost", port=8000, log_level="info")
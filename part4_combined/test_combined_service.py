@@ -0,0 +1,65 @@
+# test_combined_service.py
+import pytest
+from fastapi.testclient import TestClient
+from lxml import etree
+
+import combined_service
+import rest_service
+import soap_service
+
+TNS = "inventory.soap"
+
+def envelope(operation, body=""):
+    return (
+        '<soapenv:Envelope xmlns:soapenv="http://schemas.xmlsoap.org/soap/envelope/" '
+        f'xmlns:tns="{TNS}"><soapenv:Body><tns:{operation}>{body}</tns:{operation}>'
+        "</soapenv:Body></soapenv:Envelope>"
+    ).encode()
+
+def soap_names(client):
+    response = client.post("/soap/", content=envelope("GetAllProductsTyped"),
+                           headers={"Content-Type": "text/xml; charset=utf-8"})
+    assert response.status_code == 200
+    return [name.text for name in etree.fromstring(response.content).iter(f"{{{TNS}}}name")]
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The REST tests swap SessionLocal out; put the module's own one back
+    monkeypatch.setattr(rest_service, "SessionLocal", rest_service.sessionmaker(autocommit=False, autoflush=False))
+    monkeypatch.setattr(rest_service, "replica_sessions", [])
+    app = combined_service.create_app(f"sqlite:///{tmp_path / 'inventory.db'}", pool_size=2, max_overflow=0)
+    soap_service.response_cache.clear()
+    with TestClient(app) as client:
+        yield client
+    combined_service.unshare_invalidation()
+    soap_service.SessionLocal.configure(bind=soap_service.engine)
+
+def test_one_pool_for_both_protocols(client):
+    engine = rest_service.SessionLocal.kw["bind"]
+    assert soap_service.SessionLocal.kw["bind"] is engine
+    assert engine.pool.size() == 2
+
+    wsdl = client.get("/soap/", params={"wsdl": ""})
+    assert wsdl.status_code == 200
+    assert etree.fromstring(wsdl.content).tag == "{http://schemas.xmlsoap.org/wsdl/}definitions"
+
+def test_writes_invalidate_both_caches(client):
+    combined_service.share_invalidation()  # registers each listener once
+    assert len(rest_service.on_collection_change) == len(soap_service.response_cache.on_clear) == 1
+    # Both listings are cached while empty
+    assert client.get("/products").json() == []
+    assert soap_names(client) == []
+
+    created = client.post("/soap/", content=envelope(
+        "CreateProduct", "<tns:name>Laptop</tns:name><tns:quantity>5</tns:quantity><tns:price>999.99</tns:price>"
+    ), headers={"Content-Type": "text/xml; charset=utf-8"})
+    assert b"created successfully" in created.content
+    assert [p["name"] for p in client.get("/products").json()] == ["Laptop"]
+    assert soap_names(client) == ["Laptop"]
+
+    assert client.post("/products", json={"name": "Mouse", "quantity": 20, "price": 29.99}).status_code == 201
+    assert soap_names(client) == ["Laptop", "Mouse"]
+
+    assert client.post("/soap/json/DeleteProduct", data={"product_id": 1}).status_code == 200
+    assert [p["name"] for p in client.get("/products").json()] == ["Mouse"]
+    assert soap_names(client) == ["Mouse"]